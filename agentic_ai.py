@@ -4,13 +4,24 @@ import os
 import re
 import json
 import asyncio
-import openai
 import sqlite3
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-
-from tools.tool_registry import tool_registry  # your { name: (func, schema) }
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Any
+
+from tools.tool_registry import tool_registry, TOOL_CONCURRENCY_LIMITS, DEFAULT_TOOL_CONCURRENCY  # your { name: (func, schema) }
+from llm_client import stream_chat_completion
+from memory.sqlite_pool import get_connection
+from memory.migrations import migrate, AGENT_DB_MIGRATIONS
+from memory.write_behind import write_journal
+from memory.memory_store import SessionContext
+from json_stream import AnswerStreamExtractor
+from history_manager import compact_history
+from request_builder import RequestBuilder
+from answer_cache import answer_cache, is_cacheable_turn, is_cacheable_answer
+from intent_router import route as route_intent
+from response_schema import parse_agent_response, RESPONSE_FORMAT, STRUCTURED_OUTPUT_ENABLED
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -21,178 +32,95 @@ def get_india_time():
     return datetime.now(ZoneInfo("Asia/Kolkata")).isoformat()
 
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 DB_PATH = "chat_history.db"
+MAX_ROWID = 2 ** 63 - 1
 print(f"[DEBUG] Using DB at: {os.path.abspath(DB_PATH)}")
 
-def extract_json_from_response(text: str):
-    """Enhanced JSON extraction with better error handling"""
-    if not text:
-        return None
-        
-    print(f"[DEBUG] Extracting JSON from: {text[:200]}...")
-    
-    # Clean the text
-    text = text.strip()
-    if text.startswith("```json"): text = text[7:]
-    if text.startswith("```"):     text = text[3:]
-    if text.endswith("```"):       text = text[:-3]
-    text = text.strip()
-    
-    # Remove trailing commas before } or ]
-    text = re.sub(r',(\s*[}\]])', r'\1', text)
-    
-    # Try direct parsing first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
-        print(f"[DEBUG] Direct JSON parse failed: {e}")
-    
-    # Try to find JSON objects in the text
-    matches = list(re.finditer(r"(\{.*\})", text, re.DOTALL))
-    matches.sort(key=lambda m: len(m.group(1)), reverse=True)
-    
-    for m in matches:
-        try:
-            return json.loads(m.group(1))
-        except json.JSONDecodeError:
-            continue
-    
-    print("[ERROR] Could not extract valid JSON from response")
-    return None
-
 def get_db():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's pooled database connection (rows are sqlite3.Row)"""
+    return get_connection(DB_PATH)
 
 def initialize_database():
-    """Initialize database with required tables"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Create session table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS session (
-            session_id TEXT PRIMARY KEY,
-            is_logged_in BOOLEAN DEFAULT 0,
-            user_phone TEXT,
-            user_id TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Create enhanced history table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id TEXT NOT NULL,
-            role TEXT NOT NULL,
-            content TEXT NOT NULL,
-            tool_name TEXT,
-            tool_args TEXT,
-            tool_response TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            message_index INTEGER,
-            FOREIGN KEY (session_id) REFERENCES session(session_id)
-        )
-    """)
-    
-    # Create tickets table for issue tracking
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tickets (
-            ticket_id TEXT PRIMARY KEY,
-            session_id TEXT NOT NULL,
-            user_phone TEXT,
-            issue_description TEXT NOT NULL,
-            product_info TEXT,
-            troubleshooting_steps TEXT,
-            status TEXT DEFAULT 'open',
-            priority TEXT DEFAULT 'medium',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Bring the database schema up to date (run once at startup, not per turn)"""
+    migrate(DB_PATH, AGENT_DB_MIGRATIONS)
 
 def is_user_logged_in(session_id: str) -> bool:
     """Check if user is logged in for the session"""
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT is_logged_in FROM session WHERE session_id = ?", (session_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = conn.execute("SELECT is_logged_in FROM session WHERE session_id = ?", (session_id,)).fetchone()
     return bool(row and row["is_logged_in"])
 
+@lru_cache(maxsize=10000)
 def ensure_session_exists(session_id: str):
-    """Ensure session exists in database"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
+    """Ensure session exists in database (memoised, so once per session per process)"""
+    write_journal.enqueue(DB_PATH, """
         INSERT OR IGNORE INTO session (session_id, is_logged_in, created_at, updated_at)
         VALUES (?, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
     """, (session_id,))
-    conn.commit()
-    conn.close()
 
 def save_chat_to_db(session_id: str, role: str, content: str, tool_name: str = None, 
                    tool_args: str = None, tool_response: str = None, message_index: int = 0):
-    """Enhanced chat saving with tool information"""
+    """Enhanced chat saving with tool information (batched by the write-behind journal)"""
     ensure_session_exists(session_id)
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
+    write_journal.enqueue(DB_PATH, """
         INSERT INTO history (session_id, role, content, tool_name, tool_args, tool_response, message_index)
         VALUES (?, ?, ?, ?, ?, ?, ?)
     """, (session_id, role, content, tool_name, tool_args, tool_response, message_index))
-    conn.commit()
-    conn.close()
 
-def get_chat_history(session_id: str, limit: int = 50) -> List[Dict]:
-    """Retrieve chat history for a session"""
+def update_session_summary(session_id: str, user_phone: Optional[str] = None,
+                           escalated: bool = False, frustrated: bool = False):
+    """
+    Record phone and escalation flags on the session's summary row.
+    Flags are sticky: once a session escalated it stays flagged.
+    Queued after the turn's history rows, whose trigger creates the row.
+    """
+    write_journal.enqueue(DB_PATH, """
+        UPDATE session_summary
+        SET user_phone = COALESCE(?, user_phone),
+            escalated = MAX(escalated, ?),
+            frustrated = MAX(frustrated, ?)
+        WHERE session_id = ?
+    """, (user_phone, int(escalated), int(frustrated), session_id))
+
+def get_chat_history(session_id: str, limit: int = 50, before_id: Optional[int] = None) -> List[Dict]:
+    """
+    Retrieve the latest `limit` messages of a session, oldest first.
+    Pass before_id (a history row id) to page further back (keyset pagination).
+    Callers on the event loop `await write_journal.wait_written()` first.
+    """
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT role, content, tool_name, tool_args, tool_response, timestamp, message_index
+    # Rowid order is insertion order; timestamps only have second resolution
+    rows = conn.execute("""
+        SELECT id, role, content, tool_name, tool_args, tool_response, timestamp, message_index
         FROM history 
-        WHERE session_id = ? 
-        ORDER BY timestamp DESC, message_index DESC
+        WHERE session_id = ? AND id < ?
+        ORDER BY id DESC
         LIMIT ?
-    """, (session_id, limit))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    """, (session_id, before_id if before_id is not None else MAX_ROWID, limit)).fetchall()
     
     history = []
-    for row in rows:
-        msg = {"role": row["role"], "content": row["content"]}
+    for row in reversed(rows):  # chronological order
         if row["tool_name"]:
-            msg["function_call"] = {
-                "name": row["tool_name"],
-                "arguments": row["tool_args"]
-            }
-        history.append(msg)
+            # A stored tool call becomes the tool_calls message plus its result
+            call = {"id": f"call_{row['id']}", "name": row["tool_name"], "arguments": row["tool_args"] or "{}"}
+            result = json.loads(row["tool_response"]) if row["tool_response"] else None
+            history.extend(_tool_call_messages([call], [result]))
+        else:
+            history.append({"role": row["role"], "content": row["content"]})
     
-    return list(reversed(history))  # Return in chronological order
+    return history
 
 def save_ticket(session_id: str, ticket_id: str, user_phone: str, issue_description: str, 
                 product_info: str = None, troubleshooting_steps: str = None):
     """Save ticket information to database"""
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO tickets (ticket_id, session_id, user_phone, issue_description, 
-                           product_info, troubleshooting_steps)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (ticket_id, session_id, user_phone, issue_description, product_info, troubleshooting_steps))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("""
+            INSERT INTO tickets (ticket_id, session_id, user_phone, issue_description, 
+                               product_info, troubleshooting_steps)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (ticket_id, session_id, user_phone, issue_description, product_info, troubleshooting_steps))
 
 def analyze_user_frustration(messages: List[Dict]) -> Dict[str, Any]:
     """Analyze user messages for frustration indicators"""
@@ -207,7 +135,7 @@ def analyze_user_frustration(messages: List[Dict]) -> Dict[str, Any]:
     user_messages = [msg for msg in messages if msg.get("role") == "user"]
     
     for msg in user_messages:
-        content = msg.get("content", "").lower()
+        content = (msg.get("content") or "").lower()
         
         # Check for frustration keywords
         for keyword in frustration_keywords:
@@ -225,20 +153,24 @@ def analyze_user_frustration(messages: List[Dict]) -> Dict[str, Any]:
         "user_message_count": len(user_messages)
     }
 
-def get_context_from_history(session_id: str) -> Dict[str, Any]:
+def get_session_history(session: SessionContext) -> List[Dict]:
+    """This session's stored agent history, read once per request"""
+    return session.lazy("agent_history", lambda: get_chat_history(session.session_id))
+
+def get_context_from_history(session: SessionContext) -> Dict[str, Any]:
     """Get relevant context from chat history"""
-    history = get_chat_history(session_id)
+    history = get_session_history(session)
     
     context = {
         "previous_issues": [],
         "user_products": [],
         "troubleshooting_attempted": [],
         "user_phone": None,
-        "user_logged_in": is_user_logged_in(session_id)
+        "user_logged_in": session.lazy("agent_logged_in", lambda: is_user_logged_in(session.session_id))
     }
     
     for msg in history:
-        content = msg.get("content", "")
+        content = msg.get("content") or ""
         
         # Extract user phone if mentioned
         if msg.get("role") == "user" and not context["user_phone"]:
@@ -399,147 +331,321 @@ For orders, include:
 REMEMBER: Never recommend new products or provide pricing. Focus on solving existing issues.
 """
 
+# System prompt and tool schemas are serialized once so every request shares a cacheable prefix
+request_builder = RequestBuilder(ENHANCED_LOTUS_SYSTEM_PROMPT, tool_registry)
+
+
+async def _stream_completion(deadline: Optional[float] = None, **kwargs):
+    """
+    Stream one completion, yielding ("delta", text) for each content chunk
+    and finally ("message", content, tool_calls, truncated) once it is
+    complete, where tool_calls is a list of {"id", "name", "arguments"}.
+    If the time.monotonic() deadline passes first, the request is aborted
+    and truncated is True (tool calls are dropped, content is partial).
+    Provider usage (incl. cached prompt tokens) is recorded on request_builder.
+    """
+    content_parts = []
+    calls: Dict[int, Dict[str, Any]] = {}
+    truncated = False
+    # Usage arrives on a final chunk without choices
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    stream = stream_chat_completion(**kwargs)
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                truncated = True
+                break
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                truncated = True
+                break
+            if getattr(chunk, "usage", None) is not None:
+                request_builder.record_usage(chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for tool_call in delta.tool_calls or []:
+                # Parallel calls arrive interleaved, told apart by index
+                call = calls.setdefault(tool_call.index, {"id": None, "name": "", "arguments": []})
+                if tool_call.id:
+                    call["id"] = tool_call.id
+                if tool_call.function and tool_call.function.name:
+                    call["name"] += tool_call.function.name
+                if tool_call.function and tool_call.function.arguments:
+                    call["arguments"].append(tool_call.function.arguments)
+            if delta.content:
+                content_parts.append(delta.content)
+                yield "delta", delta.content
+    finally:
+        await stream.aclose()
+    tool_calls = [] if truncated else [
+        {"id": call["id"] or f"call_{index}", "name": call["name"], "arguments": "".join(call["arguments"])}
+        for index, call in sorted(calls.items())
+    ]
+    yield "message", "".join(content_parts), tool_calls, truncated
+
+
+# Per-turn budget of the tool-calling loop
+AGENT_MAX_STEPS = max(int(os.getenv("AGENT_MAX_STEPS", "4")), 1)              # completions per turn
+AGENT_TURN_DEADLINE = float(os.getenv("AGENT_TURN_DEADLINE", "45"))   # seconds per turn
+AGENT_ANSWER_RESERVE = float(os.getenv("AGENT_ANSWER_RESERVE", "8"))  # seconds kept for the final answer
+BUDGET_EXHAUSTED_ANSWER = "Sorry, this is taking longer than expected. Please try again in a moment."
+
+agent_stats = {
+    "turns": 0,
+    "steps": 0,
+    "tool_calls": 0,
+    "budget_exhausted": 0,
+    "total_turn_ms": 0,
+    "max_turn_ms": 0,
+}
 
+def _record_turn(step_timings: List[Dict[str, Any]], turn_started: float, budget_exhausted: bool = False):
+    elapsed_ms = round((time.monotonic() - turn_started) * 1000)
+    agent_stats["turns"] += 1
+    agent_stats["steps"] += len(step_timings)
+    agent_stats["tool_calls"] += sum(len(timing.get("tools", [])) for timing in step_timings)
+    agent_stats["budget_exhausted"] += int(budget_exhausted)
+    agent_stats["total_turn_ms"] += elapsed_ms
+    agent_stats["max_turn_ms"] = max(agent_stats["max_turn_ms"], elapsed_ms)
+
+def get_agent_stats() -> Dict[str, Any]:
+    """Turn/step counters of the tool-calling loop"""
+    turns = agent_stats["turns"]
+    return {
+        **agent_stats,
+        "max_steps": AGENT_MAX_STEPS,
+        "turn_deadline_s": AGENT_TURN_DEADLINE,
+        "avg_steps": round(agent_stats["steps"] / turns, 2) if turns else 0.0,
+        "avg_turn_ms": round(agent_stats["total_turn_ms"] / turns) if turns else 0,
+    }
 
-async def chat_with_agent(message: str, session_id: str, memory: dict) -> Dict[str, Any]:
-    """Enhanced chat function with robust error handling and context awareness"""
-    
-    # Initialize database if needed
-    initialize_database()
-    ensure_session_exists(session_id)
+
+_tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def _tool_semaphore(name: str) -> asyncio.Semaphore:
+    """Per-tool concurrency limit, shared by every session in this process"""
+    semaphore = _tool_semaphores.get(name)
+    if semaphore is None:
+        limit = TOOL_CONCURRENCY_LIMITS.get(name, DEFAULT_TOOL_CONCURRENCY)
+        semaphore = _tool_semaphores[name] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+async def _call_tool(name: str, args: Dict[str, Any]) -> Any:
+    """Execute a registered tool by name"""
+    fn, _ = tool_registry.get(name, (None, None))
+    if not fn:
+        return {"error": f"Function {name} not found"}
+    async with _tool_semaphore(name):
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(**args)
+        return fn(**args)
+
+
+async def _run_tool_call(call: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+    """Execute one tool call from the model; failures become an error result"""
+    try:
+        args = json.loads(call["arguments"] or "{}")
+    except json.JSONDecodeError as e:
+        return {"error": f"Invalid arguments for {call['name']}: {e}"}
+    try:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        return await asyncio.wait_for(_call_tool(call["name"], args), timeout)
+    except asyncio.TimeoutError:
+        print(f"[ERROR] Tool {call['name']} ran past its deadline")
+        return {"error": f"{call['name']} timed out"}
+    except Exception as e:
+        print(f"[ERROR] Tool {call['name']} failed: {e}")
+        return {"error": f"{call['name']} failed: {str(e)}"}
+
+
+def _tool_call_messages(calls: List[Dict[str, Any]], results: List[Any]) -> List[Dict[str, Any]]:
+    """The assistant tool_calls message and one tool message per result"""
+    messages = [{
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+            for call in calls
+        ]
+    }]
+    for call, result in zip(calls, results):
+        messages.append({"role": "tool", "tool_call_id": call["id"], "content": json.dumps(result)})
+    return messages
+
+
+async def chat_with_agent_events(message: str, session: SessionContext) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one agent turn as a stream of events:
+      {"event": "token", "data": {"text": ...}}    - new text of data.answer
+      {"event": "tool", "data": {"name": ..., "status": "started"|"finished"}}
+      {"event": "reset", "data": {}}               - discard streamed text so far
+      {"event": "done", "data": <parsed response>} - always the last event
+    """
+    session_id = session.session_id
+    await write_journal.wait_written()  # read our own queued history writes
+    memory = await session.load_memory()
+    turn_started = time.monotonic()
     
     try:
         # Get conversation context
-        context = get_context_from_history(session_id)
+        context = get_context_from_history(session)
         
         # Build message history
         history = memory.get("history", [])
         if not history:
             # Load from database if memory is empty
-            history = get_chat_history(session_id)
+            history = get_session_history(session)
+        # Fit past turns into the history token budget
+        history, history_summary = compact_history(history, summary=memory.get("history_summary"))
         
         # Analyze user frustration
         frustration_analysis = analyze_user_frustration(history + [{"role": "user", "content": message}])
         
-        # Build messages for AI
-        messages = [{"role": "system", "content": ENHANCED_LOTUS_SYSTEM_PROMPT}]
-        
-        # Add context if available
+        # Build messages for AI: stable prefix first, volatile context last
+        context_note = None
         if context["user_phone"]:
-            messages.append({
-                "role": "system", 
-                "content": f"Context: User phone is {context['user_phone']}, logged in: {context['user_logged_in']}"
-            })
-        
-        messages.extend(history)
-        messages.append({"role": "user", "content": message})
+            context_note = f"Context: User phone is {context['user_phone']}, logged in: {context['user_logged_in']}"
+        messages = request_builder.build_messages(history, message, summary=history_summary, context=context_note)
+        turn_start = len(messages) - 1
         
         # Save user message
         save_chat_to_db(session_id, "user", message, message_index=len(messages))
         
-        # Get AI response with function calling
-        function_schemas = [schema for _, schema in tool_registry.values()]
+        # Generic first questions of anonymous sessions may reuse an earlier answer
+        cacheable = is_cacheable_turn(session.is_authenticated or context["user_logged_in"], context["user_phone"], history)
+        cached_content, question_vector = await answer_cache.lookup(message) if cacheable else (None, None)
+        if cached_content is not None:
+            text = AnswerStreamExtractor().feed(cached_content)
+            if text:
+                yield {"event": "token", "data": {"text": text}}
         
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            functions=function_schemas,
-            function_call="auto",
-            temperature=0.7,
-            max_tokens=1500
-        )
+        # Tool-calling loop: each step either answers or calls tools (any
+        # number, concurrently). Bounded by AGENT_MAX_STEPS and the turn deadline.
+        deadline = turn_started + AGENT_TURN_DEADLINE
+        # Tools must finish in time for the answering step to keep its reserve
+        tool_deadline = deadline - AGENT_ANSWER_RESERVE
+        step_timings = []
+        assistant_content = cached_content
+        best_content = ""
         
-        plan = response.choices[0].message
-        
-        # Handle function calls
-        if plan.function_call:
-            function_name = plan.function_call.name
-            function_args = json.loads(plan.function_call.arguments or "{}")
-            
-            print(f"[DEBUG] Calling function: {function_name} with args: {function_args}")
-            
-            # Execute function
-            fn, _ = tool_registry.get(function_name, (None, None))
-            if fn:
-                if asyncio.iscoroutinefunction(fn):
-                    tool_response = await fn(**function_args)
-                else:
-                    tool_response = fn(**function_args)
-            else:
-                tool_response = {"error": f"Function {function_name} not found"}
-            
-            print(f"[DEBUG] Function response: {tool_response}")
-            
-            # Save function call
+        # Mechanically obvious turns (phone number, OTP, "my orders") skip the
+        # planning completion: the tool runs now and the model only phrases it
+        route = None
+        if cached_content is None:
+            route = route_intent(message, history, session_id,
+                                 logged_in=session.is_authenticated or context["user_logged_in"],
+                                 session_token=session.auth_token)
+        if route is not None:
+            call = {"id": f"call_{route.name}_{len(messages)}", "name": route.tool, "arguments": json.dumps(route.args)}
+            yield {"event": "tool", "data": {"name": call["name"], "status": "started"}}
+            tools_started = time.monotonic()
+            tool_response = await _run_tool_call(call, tool_deadline)
+            step_timings.append({
+                "step": 0, "route": route.name, "tools": [call["name"]],
+                "tools_ms": round((time.monotonic() - tools_started) * 1000)
+            })
+            yield {"event": "tool", "data": {"name": call["name"], "status": "finished"}}
+            print(f"[DEBUG] Routed {route.name} -> {call['name']}")  # no payload: sign_in returns the auth token
             save_chat_to_db(
-                session_id, 
-                "assistant", 
-                f"Called {function_name}",
-                tool_name=function_name,
-                tool_args=json.dumps(function_args),
+                session_id,
+                "assistant",
+                f"Called {call['name']}",
+                tool_name=call["name"],
+                tool_args=call["arguments"],
                 tool_response=json.dumps(tool_response),
                 message_index=len(messages) + 1
             )
+            messages.extend(_tool_call_messages([call], [tool_response]))
+        
+        for step in range(1, AGENT_MAX_STEPS + 1 if cached_content is None else 1):
+            # The last step, or one without time left for another tool round, must answer
+            allow_tools = step < AGENT_MAX_STEPS and deadline - time.monotonic() > AGENT_ANSWER_RESERVE
+            timing = {"step": step}
+            step_timings.append(timing)
             
-            # Add function call to message history
-            messages.append({
-                "role": "assistant",
-                "function_call": {"name": function_name, "arguments": json.dumps(function_args)}
-            })
-            messages.append({
-                "role": "function",
-                "name": function_name,
-                "content": json.dumps(tool_response)
-            })
-            
-            # Auto-call send_otp after successful check_user
-            if function_name == "check_user" and tool_response.get("is_register"):
-                send_otp_fn, _ = tool_registry.get("send_otp", (None, None))
-                if send_otp_fn:
-                    otp_args = {"phone": function_args.get("phone")}
-                    if asyncio.iscoroutinefunction(send_otp_fn):
-                        otp_response = await send_otp_fn(**otp_args)
-                    else:
-                        otp_response = send_otp_fn(**otp_args)
-                    
-                    # Save OTP call
-                    save_chat_to_db(
-                        session_id,
-                        "assistant",
-                        "Called send_otp",
-                        tool_name="send_otp",
-                        tool_args=json.dumps(otp_args),
-                        tool_response=json.dumps(otp_response),
-                        message_index=len(messages) + 2
-                    )
-                    
-                    messages.append({
-                        "role": "assistant",
-                        "function_call": {"name": "send_otp", "arguments": json.dumps(otp_args)}
-                    })
-                    messages.append({
-                        "role": "function",
-                        "name": "send_otp",
-                        "content": json.dumps(otp_response)
-                    })
-            
-            # Get final response
-            final_response = openai.chat.completions.create(
-                model="gpt-4o",
+            step_started = time.monotonic()
+            extractor = AnswerStreamExtractor()
+            async for item in _stream_completion(
+                deadline=deadline,
                 messages=messages,
+                tools=request_builder.tools,
+                tool_choice="auto" if allow_tools else "none",
+                **({"response_format": RESPONSE_FORMAT} if STRUCTURED_OUTPUT_ENABLED else {}),
                 temperature=0.7,
                 max_tokens=1500
-            )
+            ):
+                if item[0] == "delta":
+                    text = extractor.feed(item[1])
+                    if text:
+                        yield {"event": "token", "data": {"text": text}}
+                else:
+                    _, step_content, tool_calls, truncated = item
+            timing["llm_ms"] = round((time.monotonic() - step_started) * 1000)
+            
+            if truncated:
+                break
+            if not tool_calls:
+                assistant_content = step_content
+                break
+            if step_content.strip():
+                best_content = step_content
+            if extractor.answer:
+                yield {"event": "reset", "data": {}}
+            
+            # Execute all calls concurrently (each bounded by its tool's limit and tool_deadline)
+            for call in tool_calls:
+                yield {"event": "tool", "data": {"name": call["name"], "status": "started"}}
+            tools_started = time.monotonic()
+            tool_results = await asyncio.gather(*(_run_tool_call(call, tool_deadline) for call in tool_calls))
+            timing["tools"] = [call["name"] for call in tool_calls]
+            timing["tools_ms"] = round((time.monotonic() - tools_started) * 1000)
+            for call in tool_calls:
+                yield {"event": "tool", "data": {"name": call["name"], "status": "finished"}}
+            
+            # Names and sizes only: arguments and results carry auth tokens, OTPs and order data
+            sizes = [f"{call['name']} ({len(json.dumps(result))} bytes)" for call, result in zip(tool_calls, tool_results)]
+            print(f"[DEBUG] Step {step} tools in {timing['tools_ms']} ms: {', '.join(sizes)}")
             
-            assistant_content = final_response.choices[0].message.content
+            # Save tool calls
+            for offset, (call, tool_response) in enumerate(zip(tool_calls, tool_results), start=1):
+                save_chat_to_db(
+                    session_id, 
+                    "assistant", 
+                    f"Called {call['name']}",
+                    tool_name=call["name"],
+                    tool_args=call["arguments"],
+                    tool_response=json.dumps(tool_response),
+                    message_index=len(messages) + offset
+                )
+            
+            # Add tool calls and results to message history
+            messages.extend(_tool_call_messages(tool_calls, tool_results))
+        
+        if assistant_content is None:
+            # Out of time: the answer streamed so far, else any earlier text
+            _record_turn(step_timings, turn_started, budget_exhausted=True)
+            if extractor.answer or not best_content:
+                assistant_content = json.dumps({
+                    "status": "success",
+                    "data": {"answer": extractor.answer or BUDGET_EXHAUSTED_ANSWER, "budget_exhausted": True}
+                })
+            else:
+                assistant_content = best_content
         else:
-            assistant_content = plan.content
+            _record_turn(step_timings, turn_started)
+        print(f"[DEBUG] Turn timings: {step_timings}")
         
         # Save assistant response
         save_chat_to_db(session_id, "assistant", assistant_content, message_index=len(messages) + 3)
         
-        # Parse JSON response
-        parsed_response = extract_json_from_response(assistant_content)
+        # Validate the schema-constrained reply (salvages free-form JSON if needed)
+        parsed_response = parse_agent_response(assistant_content)
         
         if not parsed_response:
             # Fallback response
@@ -557,12 +663,30 @@ async def chat_with_agent(message: str, session_id: str, memory: dict) -> Dict[s
             parsed_response["data"]["frustration_detected"] = True
             parsed_response["data"]["escalation_needed"] = True
         
+        if cacheable and cached_content is None:
+            tools_called = any(timing.get("tools") for timing in step_timings)
+            if is_cacheable_answer(parsed_response, tools_called):
+                answer_cache.store(message, assistant_content, question_vector)
+        
+        response_data = parsed_response.get("data")
+        update_session_summary(
+            session_id,
+            user_phone=context["user_phone"],
+            escalated=isinstance(response_data, dict) and bool(response_data.get("escalation_needed")),
+            frustrated=frustration_analysis["is_frustrated"]
+        )
+        
         # Update memory
-        memory["history"] = messages + [{"role": "assistant", "content": assistant_content}]
+        # Store this turn without the system prompt, compacted for the next one
+        memory["history"], memory["history_summary"] = compact_history(
+            history + messages[turn_start:] + [{"role": "assistant", "content": assistant_content}],
+            summary=history_summary
+        )
         memory["context"] = context
         memory["frustration_analysis"] = frustration_analysis
+        memory["step_timings"] = step_timings
         
-        return parsed_response
+        yield {"event": "done", "data": parsed_response}
         
     except Exception as e:
         print(f"[ERROR] Chat processing failed: {str(e)}")
@@ -570,14 +694,20 @@ async def chat_with_agent(message: str, session_id: str, memory: dict) -> Dict[s
         # Save error to database
         save_chat_to_db(session_id, "system", f"Error: {str(e)}")
         
-        return {
+        yield {"event": "done", "data": {
             "status": "error",
             "data": {
                 "answer": "I apologize, but I'm experiencing technical difficulties. Please try again in a moment, or I can connect you with a human agent.",
                 "escalation_needed": True,
                 "error": str(e)
             }
-        }
+        }}
 
-# Initialize database on module import
-initialize_database()
\ No newline at end of file
+
+async def chat_with_agent(message: str, session: SessionContext) -> Dict[str, Any]:
+    """Enhanced chat function with robust error handling and context awareness"""
+    response = None
+    async for event in chat_with_agent_events(message, session):
+        if event["event"] == "done":
+            response = event["data"]
+    return response
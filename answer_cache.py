@@ -0,0 +1,166 @@
+# answer_cache.py
+
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))  # min cosine similarity
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))                # seconds an answer is reused
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_MAX_QUERY_CHARS = 200  # longer messages are rarely generic questions
+
+# Digits mean a phone number, OTP, pin code or order id: a tool call, not an FAQ
+BYPASS_RE = re.compile(r"\d")
+
+_embedder = None
+_numpy = None
+
+
+def _load_embedder():
+    """Import vector_search's batching embedding_service (slow: builds the index client and disk cache)"""
+    global _embedder, _numpy
+    try:
+        import numpy
+        from vector_search import embedding_service
+        _numpy, _embedder = numpy, embedding_service
+    except Exception as e:  # sentence-transformers / pinecone not installed
+        print(f"[DEBUG] Answer cache disabled, embeddings unavailable ({e})")
+
+
+def normalize_query(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+class SemanticAnswerCache:
+    """
+    Reuses final answers to generic questions asked in a fresh conversation.
+
+    Questions are embedded with the all-MiniLM-L6-v2 model of vector_search
+    and compared by cosine similarity against earlier questions; an answer is
+    reused when the best match reaches `threshold` and is younger than `ttl`.
+    At most `max_entries` answers are kept, least recently used evicted first.
+
+    Callers decide what is cacheable (see is_cacheable_turn); the cache itself
+    skips messages that look like tool input (digits) or are too long.
+    The embedder is loaded by start() (the app lifespan hook), off the event
+    loop; until then every message is bypassed.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, enabled: bool = ANSWER_CACHE_ENABLED):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # key -> (unit embedding, answer, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Any, str, float]]" = OrderedDict()
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.stores = 0
+
+    def bypass(self, message: str) -> bool:
+        """True if the message must always go to the model"""
+        return (not self.enabled
+                or len(message) > ANSWER_CACHE_MAX_QUERY_CHARS
+                or bool(BYPASS_RE.search(message))
+                or _embedder is None)
+
+    async def embed(self, message: str):
+        """Unit-length embedding of the normalized message (batched off the event loop)"""
+        vector = await _embedder.embed(normalize_query(message))
+        vector = _numpy.asarray(vector, dtype=_numpy.float32)
+        norm = float(_numpy.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        for key, (_, _, stored_at) in list(self._entries.items()):
+            if now - stored_at <= self.ttl:
+                continue
+            del self._entries[key]
+            self.expirations += 1
+
+    async def lookup(self, message: str) -> Tuple[Optional[str], Any]:
+        """
+        (answer, embedding) for message. answer is None on a miss; the
+        embedding is passed back to store() so it is not computed twice.
+        """
+        if self.bypass(message):
+            self.bypassed += 1
+            return None, None
+        self.lookups += 1
+        vector = await self.embed(message)
+        self._expire(time.monotonic())
+        if not self._entries:
+            self.misses += 1
+            return None, vector
+        keys = list(self._entries)
+        matrix = _numpy.stack([self._entries[key][0] for key in keys])
+        scores = matrix @ vector
+        best = int(scores.argmax())
+        if float(scores[best]) < self.threshold:
+            self.misses += 1
+            return None, vector
+        self._entries.move_to_end(keys[best])
+        self.hits += 1
+        return self._entries[keys[best]][1], vector
+
+    def store(self, message: str, answer: str, vector: Any):
+        if vector is None or not self.enabled:
+            return
+        key = normalize_query(message)
+        self._entries[key] = (vector, answer, time.monotonic())
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def start(self):
+        """Load the embedder in a worker thread so startup does not block the loop"""
+        if self.enabled and _embedder is None:
+            await asyncio.to_thread(_load_embedder)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled and _embedder is not None,
+            "entries": len(self._entries),
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+def is_cacheable_turn(logged_in: bool, user_phone: Optional[str], history: List[Dict[str, Any]]) -> bool:
+    """Only anonymous, context-free turns may share answers across sessions"""
+    return not logged_in and not user_phone and not history
+
+
+def is_cacheable_answer(parsed: Optional[Dict[str, Any]], tools_called: bool) -> bool:
+    """A plain successful answer, produced without any tool call"""
+    if tools_called or not isinstance(parsed, dict) or parsed.get("status") != "success":
+        return False
+    data = parsed.get("data")
+    if not isinstance(data, dict) or not data.get("answer"):
+        return False
+    return not (data.get("escalation_needed") or data.get("budget_exhausted") or data.get("orders"))
+
+
+answer_cache = SemanticAnswerCache()
@@ -1,19 +1,31 @@
 from fastapi import FastAPI, Request, Depends, Form
 from pydantic import BaseModel
 from tools import tool_registry
-from memory.memory_store import get_session_memory, authenticate_user, add_chat_message, is_authenticated
+from memory.memory_store import load_session, authenticate_user, start_session_store, stop_session_store, get_memory_stats
 from fastapi.responses import RedirectResponse
 import uvicorn
 from fastapi.templating import Jinja2Templates
 from fastapi import FastAPI, Request, HTTPException, Depends, Header
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
+import sys
+import json
+import asyncio
+from typing import Optional
+from urllib.parse import urlencode
+from contextlib import asynccontextmanager
 from tools.auth import check_user, send_otp, verify_otp, sign_in
 import sqlite3
+import llm_client
+from memory.sqlite_pool import get_connection, close_all as close_db_connections
+from memory import sqlite_pool
+from memory.write_behind import write_journal
+from tools.portal_client import portal_client
+from tools.tool_registry import get_tool_cache_stats
 from starlette.middleware.sessions import SessionMiddleware
 # from setup_db import init_db 
 import sqlite3
@@ -22,11 +34,48 @@ import sqlite3
 # from openai_agent import chat_with_agent
 
 
-from agentic_ai import chat_with_agent, get_chat_history, get_context_from_history, get_db
+from agentic_ai import chat_with_agent, chat_with_agent_events, get_chat_history, get_context_from_history, get_db, initialize_database, get_agent_stats, request_builder
+from history_manager import get_history_stats
+from answer_cache import answer_cache
+from intent_router import get_router_stats
+from response_schema import get_parse_stats
+from memory.database import db_manager
+from tools.raise_ticket import init_db as init_tickets_db
 
 
 
-app = FastAPI(title="Lotus Shopping Assistant")
+DISCONNECT_POLL_INTERVAL = 0.5  # seconds between client-disconnect checks
+
+
+def preload_product_search():
+    """Import product search, load its embedding model and warm frequent query embeddings (blocking)"""
+    try:
+        import vector_search
+        vector_search.preload_model()
+    except Exception as e:  # sentence-transformers / pinecone not installed, model download failed
+        print(f"[ERROR] Product search warm-up failed, continuing without it: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema migrations run once here, never on the request path
+    initialize_database()
+    db_manager.init_database()
+    init_tickets_db()
+    await write_journal.start()
+    await start_session_store()
+    await portal_client.start()
+    await answer_cache.start()  # imports vector_search (index client, disk cache) off the loop
+    await asyncio.to_thread(preload_product_search)
+    yield
+    await portal_client.close()
+    await stop_session_store()
+    await write_journal.stop()  # flush queued history rows
+    await llm_client.close()
+    close_db_connections()
+
+
+app = FastAPI(title="Lotus Shopping Assistant", lifespan=lifespan)
 static_path = os.path.join(os.path.dirname(__file__), "static")
 app.mount("/static", StaticFiles(directory=static_path), name="static")
 
@@ -62,14 +111,68 @@ class SignInRequest(BaseModel):
     session_id: str
 
 
+async def run_until_disconnected(request: Request, coro):
+    """
+    Await coro, cancelling it if the HTTP client goes away meanwhile.
+    Returns None when the request was abandoned.
+    """
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            print("[DEBUG] Client disconnected, cancelled agent turn")
+            return None
+
+
 @app.post("/chat")
-async def chat_endpoint(req: ChatRequest):
-    mem = get_session_memory(req.session_id)
-    add_chat_message(req.session_id, "user", req.message)
-    resp = await chat_with_agent(req.message, req.session_id, mem)
-    if resp.get("data", {}).get("answer"):
-        add_chat_message(req.session_id, "assistant", resp["data"]["answer"])
-    return {"response": resp}
+async def chat_endpoint(req: ChatRequest, request: Request):
+    session = load_session(req.session_id)
+    session.add_chat_message("user", req.message)
+    try:
+        resp = await run_until_disconnected(request, chat_with_agent(req.message, session))
+        if resp is None:
+            return JSONResponse(content={"error": "client disconnected"}, status_code=499)
+        if resp.get("data", {}).get("answer"):
+            session.add_chat_message("assistant", resp["data"]["answer"])
+        return {"response": resp}
+    finally:
+        await session.commit()
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent-Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """
+    Same as /chat but streams the reply as Server-Sent Events: `token` events
+    carry new text of data.answer as it is generated, `tool` events report
+    tool-call progress and the final `done` event carries the full response.
+    """
+    session = load_session(req.session_id)
+    session.add_chat_message("user", req.message)
+
+    async def event_source():
+        # Starlette closes this generator when the client disconnects,
+        # which cancels the in-flight completion.
+        try:
+            async for event in chat_with_agent_events(req.message, session):
+                if event["event"] == "done" and event["data"].get("data", {}).get("answer"):
+                    session.add_chat_message("assistant", event["data"]["data"]["answer"])
+                yield sse_event(event["event"], event["data"])
+        finally:
+            await session.commit()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/auth/check-user")
@@ -105,7 +208,7 @@ async def verify_otp_endpoint(request: OTPRequest):
             if auth_token:
                 # Authenticate user and store in database
                 user_data = result.get("data") if isinstance(result.get("data"), dict) else None
-                authenticate_user(request.session_id, request.phone, auth_token, user_data)
+                await authenticate_user(request.session_id, request.phone, auth_token, user_data)
         
         return JSONResponse(content=result)
     except Exception as e:
@@ -126,7 +229,7 @@ async def sign_in_endpoint(request: SignInRequest):
             if auth_token:
                 # Authenticate user and store in database
                 user_data = result.get("data") if isinstance(result.get("data"), dict) else None
-                authenticate_user(request.session_id, request.phone, auth_token, user_data)
+                await authenticate_user(request.session_id, request.phone, auth_token, user_data)
         
         return JSONResponse(content=result)
     except Exception as e:
@@ -136,13 +239,13 @@ async def sign_in_endpoint(request: SignInRequest):
 async def auth_status_endpoint(session_id: str):
     """Check authentication status for a session"""
     try:
-        authenticated = is_authenticated(session_id)
-        memory = get_session_memory(session_id)
+        session = load_session(session_id)
+        authenticated = session.is_authenticated
         
         return JSONResponse(content={
             "authenticated": authenticated,
-            "phone": memory.get("phone") if authenticated else None,
-            "user_data": memory.get("user_data") if authenticated else None
+            "phone": session.phone if authenticated else None,
+            "user_data": session.session_data.get("user_data") if authenticated else None
         })
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -163,6 +266,9 @@ async def speech_test(request: Request):
 ADMIN_USER = os.getenv("ADMIN_USER")
 ADMIN_PASS = os.getenv("ADMIN_PASS")
 DB_FILE = 'tickets.db'
+CONVERSATION_PAGE_SIZE = 200
+SESSIONS_PAGE_SIZE = 50
+MAX_ROWID = 2 ** 63 - 1
 
 @app.get("/admin")
 async def admin_login_get(request: Request):
@@ -180,56 +286,104 @@ async def admin_login_post(request: Request, user: str = Form(...), password: st
 async def admin_tickets(request: Request):
     if not request.session.get("admin_logged_in"):
         return RedirectResponse(url="/admin", status_code=303)
-    conn = sqlite3.connect(DB_FILE)
+    conn = get_connection(DB_FILE)
     c = conn.cursor()
     c.execute('SELECT id, timestamp, phone, name, problem, order_id, invoice_no FROM tickets ORDER BY id DESC')
     tickets = c.fetchall()
-    conn.close()
     return templates.TemplateResponse("admin_tickets.html", {"request": request, "tickets": tickets}) 
 
 
 @app.get("/admin/conversations")
-async def admin_conversations(request: Request):
+async def admin_conversations(request: Request, before: Optional[int] = None,
+                              phone: Optional[str] = None, escalated: bool = False):
     if not request.session.get("admin_logged_in"):
         return RedirectResponse(url="/admin", status_code=303)
     
-    conn = sqlite3.connect("chat_history.db")  # or your actual DB file
-    conn.row_factory = sqlite3.Row
+    conn = get_connection("chat_history.db")  # or your actual DB file
     c = conn.cursor()
 
-    # Fetch distinct sessions with latest timestamp
-    c.execute("""
-        SELECT session_id, MAX(timestamp) as last_seen
-        FROM history
-        GROUP BY session_id
-        ORDER BY last_seen DESC
-    """)
+    # Most recently active sessions first, from the incrementally maintained
+    # summary table; keyset-paginated on last_message_id.
+    query = """
+        SELECT session_id, last_seen, message_count, user_phone, escalated, frustrated, last_message_id
+        FROM session_summary
+        WHERE last_message_id < ?
+    """
+    params = [before if before is not None else MAX_ROWID]
+    if phone:
+        query += " AND user_phone = ?"
+        params.append(phone.strip())
+    if escalated:
+        query += " AND escalated = 1"
+    query += " ORDER BY last_message_id DESC LIMIT ?"
+    params.append(SESSIONS_PAGE_SIZE + 1)
+    c.execute(query, params)
     sessions = c.fetchall()
 
-    conn.close()
-    return templates.TemplateResponse("admin_conversations.html", {"request": request, "sessions": sessions})
+    next_url = None
+    if len(sessions) > SESSIONS_PAGE_SIZE:
+        sessions = sessions[:SESSIONS_PAGE_SIZE]
+        next_params = {"before": sessions[-1]["last_message_id"]}
+        if phone:
+            next_params["phone"] = phone
+        if escalated:
+            next_params["escalated"] = "true"
+        next_url = "/admin/conversations?" + urlencode(next_params)
+
+    return templates.TemplateResponse("admin_conversations.html", {
+        "request": request,
+        "sessions": sessions,
+        "phone": phone or "",
+        "escalated": escalated,
+        "next_url": next_url
+    })
 
 
 @app.get("/admin/conversations/{session_id}")
-async def view_conversation(request: Request, session_id: str):
+async def view_conversation(request: Request, session_id: str, after: int = 0):
     if not request.session.get("admin_logged_in"):
         return RedirectResponse(url="/admin", status_code=303)
 
-    conn = sqlite3.connect("chat_history.db")
-    conn.row_factory = sqlite3.Row
+    conn = get_connection("chat_history.db")
     c = conn.cursor()
+    # Keyset pagination on the (session_id, id) index
     c.execute("""
-        SELECT role, content, timestamp FROM history
-        WHERE session_id = ?
-        ORDER BY timestamp ASC
-    """, (session_id,))
+        SELECT id, role, content, timestamp FROM history
+        WHERE session_id = ? AND id > ?
+        ORDER BY id ASC
+        LIMIT ?
+    """, (session_id, after, CONVERSATION_PAGE_SIZE + 1))
     messages = c.fetchall()
-    conn.close()
+    next_after = messages[CONVERSATION_PAGE_SIZE - 1]["id"] if len(messages) > CONVERSATION_PAGE_SIZE else None
 
     return templates.TemplateResponse("admin_view_conversation.html", {
         "request": request,
         "session_id": session_id,
-        "messages": messages
+        "messages": messages[:CONVERSATION_PAGE_SIZE],
+        "next_after": next_after
+    })
+
+
+@app.get("/admin/metrics")
+async def admin_metrics(request: Request):
+    """Runtime counters of the storage and LLM layers"""
+    if not request.session.get("admin_logged_in"):
+        return RedirectResponse(url="/admin", status_code=303)
+    return JSONResponse(content={
+        "write_journal": write_journal.get_stats(),
+        "sqlite_pool": sqlite_pool.get_stats(),
+        "session_memory": get_memory_stats(),
+        "llm": llm_client.get_stats(),
+        "agent": get_agent_stats(),
+        "history": get_history_stats(),
+        "prompt_cache": request_builder.get_stats(),
+        "answer_cache": answer_cache.get_stats(),
+        "intent_router": get_router_stats(),
+        "response_parsing": get_parse_stats(),
+        "portal": portal_client.get_stats(),
+        "tool_cache": get_tool_cache_stats(),
+        # Only once something imported it: the import loads the index client and models
+        "vector_search": sys.modules["vector_search"].get_search_stats() if "vector_search" in sys.modules else None,
     })
 
 
@@ -244,9 +398,7 @@ DB_PATH = "chat_history.db"
 print(f"[DEBUG] Using DB at: {os.path.abspath(DB_PATH)}")  # <--- add this
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection(DB_PATH)
 
 
 
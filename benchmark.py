@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the chatbot storage layer
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from memory import sqlite_pool
+from memory.migrations import migrate, AGENT_DB_MIGRATIONS
+
+CHAT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, phone TEXT UNIQUE NOT NULL,
+        auth_token TEXT, user_data TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT UNIQUE NOT NULL,
+        user_id INTEGER, auth_token TEXT, phone TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS chat_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+        role TEXT NOT NULL, content TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+]
+
+AGENT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS session (
+        session_id TEXT PRIMARY KEY, is_logged_in BOOLEAN DEFAULT 0,
+        user_phone TEXT, user_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,
+        role TEXT NOT NULL, content TEXT NOT NULL, tool_name TEXT,
+        tool_args TEXT, tool_response TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, message_index INTEGER)""",
+]
+
+
+def _fresh_connect(path: str) -> sqlite3.Connection:
+    """Connection-per-statement, as the stores did before pooling"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class _FreshConnections:
+    def get(self, path):
+        return _fresh_connect(path)
+
+    def release(self, conn):
+        conn.close()
+
+
+class _PooledConnections:
+    def get(self, path):
+        return sqlite_pool.get_connection(path)
+
+    def release(self, conn):
+        pass
+
+
+def _read(pool, path, sql, params=()):
+    conn = pool.get(path)
+    rows = conn.execute(sql, params).fetchall()
+    pool.release(conn)
+    return rows
+
+
+def _write(pool, path, sql, params=()):
+    conn = pool.get(path)
+    with conn:
+        conn.execute(sql, params)
+    pool.release(conn)
+
+
+def simulate_turn(pool, chat_db: str, agent_db: str, session_id: str):
+    """The database statements issued by one anonymous /chat turn"""
+    session_sql = """
+        SELECT s.session_id, s.user_id, s.auth_token, s.phone, u.user_data, s.last_activity
+        FROM sessions s LEFT JOIN users u ON s.user_id = u.id WHERE s.session_id = ?
+    """
+    ensure_sql = "INSERT OR IGNORE INTO session (session_id, is_logged_in) VALUES (?, 0)"
+    insert_sql = """
+        INSERT INTO history (session_id, role, content, tool_name, tool_args, tool_response, message_index)
+        VALUES (?, ?, ?, NULL, NULL, NULL, ?)
+    """
+    history_sql = """
+        SELECT role, content, tool_name, tool_args, tool_response, timestamp, message_index
+        FROM history WHERE session_id = ? ORDER BY timestamp DESC, message_index DESC LIMIT 50
+    """
+
+    _read(pool, chat_db, session_sql, (session_id,))          # get_session_memory
+    _read(pool, chat_db, session_sql, (session_id,))          # add_chat_message(user)
+    _write(pool, agent_db, ensure_sql, (session_id,))         # chat_with_agent
+    _read(pool, agent_db, history_sql, (session_id,))         # get_context_from_history
+    _read(pool, agent_db, "SELECT is_logged_in FROM session WHERE session_id = ?", (session_id,))
+    for role, index in (("user", 1), ("assistant", 2)):       # save_chat_to_db x2
+        _write(pool, agent_db, ensure_sql, (session_id,))
+        _write(pool, agent_db, insert_sql, (session_id, role, "hello " * 20, index))
+    _read(pool, chat_db, session_sql, (session_id,))          # add_chat_message(assistant)
+
+
+def _setup(directory: str):
+    chat_db = os.path.join(directory, "chatbot.db")
+    agent_db = os.path.join(directory, "chat_history.db")
+    for path, schema in ((chat_db, CHAT_SCHEMA), (agent_db, AGENT_SCHEMA)):
+        conn = sqlite3.connect(path)
+        for statement in schema:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+    return chat_db, agent_db
+
+
+def bench_db(turns: int, sessions: int):
+    """Compare turns/sec with connection-per-statement vs the pooled layer"""
+    print(f"=== SQLite connection benchmark ({turns} turns, {sessions} sessions) ===")
+    results = {}
+    for label, pool in (("connect per statement", _FreshConnections()),
+                        ("pooled (WAL, tuned)", _PooledConnections())):
+        with tempfile.TemporaryDirectory() as directory:
+            chat_db, agent_db = _setup(directory)
+            start = time.perf_counter()
+            for i in range(turns):
+                simulate_turn(pool, chat_db, agent_db, f"session-{i % sessions}")
+            elapsed = time.perf_counter() - start
+            sqlite_pool.close_all()
+        results[label] = turns / elapsed
+        print(f"{label:<24} {results[label]:>10.1f} turns/sec")
+    base, pooled = results.values()
+    print(f"Speed-up: {pooled / base:.2f}x")
+
+
+OLD_HISTORY_SQL = """
+    SELECT role, content, tool_name, tool_args, tool_response, timestamp, message_index
+    FROM history WHERE session_id = ? ORDER BY timestamp DESC, message_index DESC LIMIT 50
+"""
+NEW_HISTORY_SQL = """
+    SELECT role, content, tool_name, tool_args, tool_response, timestamp, message_index
+    FROM history WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT 50
+"""
+
+
+def _fill_history(path: str, rows: int, sessions: int):
+    """Synthetic history: `rows` messages spread round-robin over `sessions`"""
+    migrate(path, [m for m in AGENT_DB_MIGRATIONS if m[0] == 1])
+    conn = sqlite_pool.get_connection(path)
+    batch = 50_000
+    with conn:
+        for start in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO history (session_id, role, content, message_index) VALUES (?, ?, ?, ?)",
+                ((f"session-{i % sessions}", "user" if i % 2 else "assistant", "hello there " * 8, i // sessions)
+                 for i in range(start, min(rows, start + batch)))
+            )
+
+
+def _time_lookups(conn, sql, params_for, lookups: int) -> float:
+    """Average milliseconds per history lookup"""
+    start = time.perf_counter()
+    for i in range(lookups):
+        conn.execute(sql, params_for(i)).fetchall()
+    return (time.perf_counter() - start) * 1000 / lookups
+
+
+def bench_history(rows: int, per_session: int, lookups: int):
+    """
+    Per-session history lookup latency before/after the (session_id, id) index.
+    Sessions keep the same length at every size, so only the table grows.
+    """
+    print(f"=== History lookup benchmark (up to {rows} rows, {per_session} messages per session) ===")
+    print(f"{'rows':>10} {'scan (ms)':>12} {'index (ms)':>12}")
+    for size in (rows // 100, rows // 10, rows):
+        sessions = max(size // per_session, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "chat_history.db")
+            _fill_history(path, size, sessions)
+            conn = sqlite_pool.get_connection(path)
+            old_ms = _time_lookups(conn, OLD_HISTORY_SQL,
+                                   lambda i: (f"session-{i * 7919 % sessions}",), max(lookups // 100, 3))
+            migrate(path, AGENT_DB_MIGRATIONS)
+            plan = conn.execute("EXPLAIN QUERY PLAN " + NEW_HISTORY_SQL, ("session-0", 2 ** 63 - 1)).fetchall()
+            new_ms = _time_lookups(conn, NEW_HISTORY_SQL,
+                                   lambda i: (f"session-{i * 7919 % sessions}", 2 ** 63 - 1), lookups)
+            sqlite_pool.close_all()
+        print(f"{size:>10} {old_ms:>12.3f} {new_ms:>12.4f}")
+    print("Query plan:", "; ".join(row[-1] for row in plan))
+
+
+def bench_vectors(vectors: int, queries: int, dim: int = 384):
+    """Local vector index query latency, unfiltered and with a price range filter"""
+    import numpy as np
+    from vector_index import LocalVectorIndex, build_local_index, with_price_value, PRICE_VALUE_FIELD
+
+    print(f"=== Local vector index benchmark ({vectors} x {dim} vectors, {queries} queries) ===")
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        build_local_index(
+            directory,
+            [f"product-{i}" for i in range(vectors)],
+            rng.standard_normal((vectors, dim), dtype=np.float32),
+            # as exported from Pinecone: display string plus its numeric copy
+            [with_price_value({"product_mrp": f"{price:,}"}) for price in rng.integers(500, 200_000, vectors)],
+        )
+        started = time.perf_counter()
+        index = LocalVectorIndex(directory)
+        print(f"Load: {(time.perf_counter() - started) * 1000:.1f} ms")
+        probes = rng.standard_normal((queries, dim), dtype=np.float32)
+        price_range = {PRICE_VALUE_FIELD: {"$gte": 10000, "$lte": 20000}}
+        for label, price_filter in (("no filter", None), ("price filter", price_range)):
+            started = time.perf_counter()
+            for probe in probes:
+                index.query(probe, 10, price_filter)
+            print(f"{label:>14}: {(time.perf_counter() - started) * 1000 / queries:.3f} ms/query")
+
+
+def bench_embeddings(concurrency: int, rounds: int = 5):
+    """Per-query encode vs the micro-batching embedding service for concurrent queries"""
+    import asyncio
+    from embedding_service import EmbeddingService
+    from vector_search import get_embedding_model
+
+    model = get_embedding_model()
+    print(f"=== Embedding benchmark ({concurrency} concurrent queries, {rounds} rounds) ===")
+    queries = [[f"smart tv under {1000 * (r * concurrency + i)} with hdr" for i in range(concurrency)]
+               for r in range(rounds)]
+
+    started = time.perf_counter()
+    for batch in queries:
+        for query in batch:
+            model.encode([query])
+    single_ms = (time.perf_counter() - started) * 1000 / rounds
+
+    service = EmbeddingService(model.encode, cache_size=0)
+
+    async def run():
+        for batch in queries:
+            await asyncio.gather(*(service.embed(query) for query in batch))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    batched_ms = (time.perf_counter() - started) * 1000 / rounds
+    service.close()
+    print(f"one at a time: {single_ms:.1f} ms per round")
+    print(f"micro-batched: {batched_ms:.1f} ms per round ({service.batches} forward passes)")
+
+
+PARITY_QUERIES = [
+    "smart tv under 30000", "how do I create an account", "store timings in indore",
+    "washing machine not draining water", "delivery charges for pin code 452001",
+    "best 5G smartphone between 15000 and 20000", "my refrigerator is making a loud noise",
+]
+# Minimum cosine similarity with the torch embedding, by quantized (also checked in tests/)
+PARITY_MIN_COSINE = {False: 0.99, True: 0.98}
+
+# Run in a fresh interpreter so import and model load times are cold
+_EMBEDDING_PROBE = """
+import json, resource, sys, time
+backend, quantized, queries = sys.argv[1], sys.argv[2] == "1", json.loads(sys.argv[3])
+started = time.perf_counter()
+if backend == "onnx":
+    from onnx_embedder import OnnxEmbedder
+    model = OnnxEmbedder(quantized=quantized)
+else:
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+model.encode([queries[0]])
+cold_ms = (time.perf_counter() - started) * 1000
+started = time.perf_counter()
+for _ in range(10):
+    for query in queries:
+        model.encode([query])
+query_ms = (time.perf_counter() - started) * 1000 / (10 * len(queries))
+print(json.dumps({"cold_ms": cold_ms, "query_ms": query_ms,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def bench_embedding_backends():
+    """Cold start, per-query latency, peak RSS and parity of the torch and ONNX embedders"""
+    import json
+    import subprocess
+    import sys
+    import numpy as np
+    from onnx_embedder import OnnxEmbedder
+    from sentence_transformers import SentenceTransformer
+
+    print("=== Embedding backend benchmark (all-MiniLM-L6-v2) ===")
+    variants = [("torch", False), ("onnx", False), ("onnx", True)]
+    print(f"{'backend':>10} {'cold start (ms)':>16} {'query (ms)':>11} {'peak RSS (MB)':>14}")
+    for backend, quantized in variants:
+        output = subprocess.run(
+            [sys.executable, "-c", _EMBEDDING_PROBE, backend, "1" if quantized else "0", json.dumps(PARITY_QUERIES)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        label = f"{backend}-int8" if quantized else backend
+        print(f"{label:>10} {result['cold_ms']:>16.0f} {result['query_ms']:>11.2f} {result['rss_mb']:>14.0f}")
+
+    # Parity: cosine similarity of each ONNX embedding with the torch one
+    reference = SentenceTransformer("all-MiniLM-L6-v2", device="cpu").encode(PARITY_QUERIES, normalize_embeddings=True)
+    failed = []
+    for quantized, minimum in PARITY_MIN_COSINE.items():
+        vectors = OnnxEmbedder(quantized=quantized).encode(PARITY_QUERIES)
+        cosines = (vectors * reference).sum(axis=1)
+        label = "onnx-int8" if quantized else "onnx"
+        if cosines.min() < minimum:
+            failed.append(label)
+        print(f"Parity {label}: min cosine {cosines.min():.5f}, mean {np.mean(cosines):.5f} "
+              f"(required >= {minimum}) {'FAIL' if label in failed else 'OK'}")
+    if failed:
+        sys.exit(f"ONNX parity check failed for {', '.join(failed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the chatbot")
+    parser.add_argument("command", choices=["db", "history", "vectors", "embeddings", "embedding-backends"],
+                       help="Benchmark to run")
+    parser.add_argument("--turns", type=int, default=2000,
+                       help="Simulated chat turns (default: 2000)")
+    parser.add_argument("--sessions", type=int, default=100,
+                       help="Distinct sessions (default: 100)")
+    parser.add_argument("--rows", type=int, default=2_000_000,
+                       help="History rows for the history benchmark (default: 2000000)")
+    parser.add_argument("--per-session", type=int, default=40,
+                       help="Messages per session for the history benchmark (default: 40)")
+    parser.add_argument("--lookups", type=int, default=2000,
+                       help="Indexed lookups per size for the history benchmark (default: 2000)")
+    parser.add_argument("--vectors", type=int, default=50_000,
+                       help="Indexed vectors for the vectors benchmark (default: 50000)")
+    parser.add_argument("--queries", type=int, default=200,
+                       help="Queries for the vectors benchmark (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=50,
+                       help="Concurrent queries for the embeddings benchmark (default: 50)")
+
+    args = parser.parse_args()
+
+    if args.command == "db":
+        bench_db(args.turns, args.sessions)
+    elif args.command == "history":
+        bench_history(args.rows, args.per_session, args.lookups)
+    elif args.command == "vectors":
+        bench_vectors(args.vectors, args.queries)
+    elif args.command == "embeddings":
+        bench_embeddings(args.concurrency)
+    elif args.command == "embedding-backends":
+        bench_embedding_backends()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# embedding_cache.py
+
+import os
+import time
+import hashlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from memory.sqlite_pool import get_connection
+from memory.migrations import migrate, EMBEDDING_CACHE_MIGRATIONS
+from memory.write_behind import write_journal
+
+EMBED_DISK_CACHE = os.getenv("EMBED_DISK_CACHE", "1") != "0"
+EMBED_DISK_CACHE_DIR = os.getenv("EMBED_DISK_CACHE_DIR", "embedding_cache")
+EMBED_DISK_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_DISK_CACHE_MAX_ENTRIES", "100000"))
+EMBED_DISK_CACHE_WARM = int(os.getenv("EMBED_DISK_CACHE_WARM", "2000"))  # queries preloaded at startup
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+INDEX_FILE = "index.db"
+
+
+def normalize_key(query: str) -> str:
+    # The model's tokenizer is uncased and ignores extra whitespace
+    return " ".join(query.lower().split())
+
+
+def _key_hash(key: str) -> Tuple[str, int]:
+    """(hex digest for the index, non-zero 64-bit tag for the slot)"""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return digest.hex(), int.from_bytes(digest[:8], "little") | 1
+
+
+def _open_array(path: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+    """Memory-map path, growing it (sparsely) to at least shape without truncating"""
+    row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as f:
+        size = f.tell()
+        if size < shape[0] * row_bytes:
+            f.truncate(shape[0] * row_bytes)
+            size = shape[0] * row_bytes
+    return np.memmap(path, dtype=dtype, mode="r+", shape=(size // row_bytes,) + shape[1:])
+
+
+class PersistentEmbeddingCache:
+    """
+    Query embeddings on disk, shared by every worker on the host.
+
+    Vectors live in a memory-mapped float32 array (one row per slot), so all
+    workers read the same page-cache pages; a SQLite table in WAL mode maps
+    the hash of each normalized query to its slot. Lookups are a primary-key
+    read plus a row copy. Hit counts and recency are recorded through the
+    write-behind journal, so reads never wait on a write lock.
+
+    When max_entries slots are used, the least recently used entry's slot
+    is reused. Each slot carries a tag of its key, written after the vector,
+    and readers check it before and after copying, so a row being replaced
+    by another worker is reported as a miss instead of a wrong vector.
+    """
+
+    def __init__(self, directory: str = EMBED_DISK_CACHE_DIR, max_entries: int = EMBED_DISK_CACHE_MAX_ENTRIES,
+                 dim: int = EMBEDDING_DIM):
+        os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.dim = dim
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        migrate(self.index_path, EMBEDDING_CACHE_MIGRATIONS)
+        self.vectors = _open_array(os.path.join(directory, f"vectors-{dim}.f32"), np.float32, (max_entries, dim))
+        self.tags = _open_array(os.path.join(directory, f"tags-{dim}.u64"), np.uint64, (max_entries,))
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.torn_reads = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _read_slot(self, slot: int, tag: int) -> Optional[List[float]]:
+        tag = np.uint64(tag)  # compare as uint64, not via float
+        if self.tags[slot] != tag:
+            return None
+        vector = np.array(self.vectors[slot])
+        if self.tags[slot] != tag:
+            self.torn_reads += 1
+            return None
+        return vector.tolist()
+
+    def get(self, query: str) -> Optional[List[float]]:
+        key_hash, tag = _key_hash(normalize_key(query))
+        row = get_connection(self.index_path).execute(
+            "SELECT slot FROM embedding_cache WHERE key_hash = ?", (key_hash,)
+        ).fetchone()
+        vector = self._read_slot(row["slot"], tag) if row is not None else None
+        if vector is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        write_journal.enqueue(self.index_path, """
+            UPDATE embedding_cache SET hits = hits + 1, last_used = ? WHERE key_hash = ?
+        """, (time.time(), key_hash))
+        return vector
+
+    def put(self, query: str, vector: Sequence[float]):
+        """Store one embedding (a no-op if the query is already cached)"""
+        key = normalize_key(query)
+        key_hash, tag = _key_hash(key)
+        conn = get_connection(self.index_path)
+        conn.execute("BEGIN IMMEDIATE")  # serialises slot allocation across workers
+        try:
+            if conn.execute("SELECT 1 FROM embedding_cache WHERE key_hash = ?", (key_hash,)).fetchone():
+                conn.rollback()
+                return
+            used = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            if used < self.max_entries:
+                slot = used  # slots are only reused after eviction, so 0..used-1 are taken
+            else:
+                victim = conn.execute(
+                    "SELECT key_hash, slot FROM embedding_cache ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                conn.execute("DELETE FROM embedding_cache WHERE key_hash = ?", (victim["key_hash"],))
+                slot = victim["slot"]
+                self.evictions += 1
+            self.tags[slot] = 0
+            self.vectors[slot] = np.asarray(vector, dtype=np.float32)
+            self.tags[slot] = tag
+            conn.execute(
+                "INSERT INTO embedding_cache (key_hash, query, slot, last_used) VALUES (?, ?, ?, ?)",
+                (key_hash, key, slot, time.time())
+            )
+            conn.commit()
+            self.writes += 1
+        except Exception:
+            conn.rollback()
+            raise
+
+    def most_frequent(self, limit: int = EMBED_DISK_CACHE_WARM) -> List[Tuple[str, List[float]]]:
+        """(normalized query, embedding) of the most often hit entries, for warm-up"""
+        rows = get_connection(self.index_path).execute(
+            "SELECT query, slot FROM embedding_cache ORDER BY hits DESC LIMIT ?", (limit,)
+        ).fetchall()
+        entries = []
+        for row in rows:
+            vector = self._read_slot(row["slot"], _key_hash(row["query"])[1])
+            if vector is not None:
+                entries.append((row["query"], vector))
+        return entries
+
+    def flush(self):
+        self.vectors.flush()
+        self.tags.flush()
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+        entries = get_connection(self.index_path).execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "torn_reads": self.torn_reads,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+def create_embedding_cache() -> Optional[PersistentEmbeddingCache]:
+    """The on-disk cache, or None when EMBED_DISK_CACHE=0 or it cannot be opened"""
+    if not EMBED_DISK_CACHE:
+        return None
+    try:
+        return PersistentEmbeddingCache()
+    except Exception as e:
+        print(f"[ERROR] Embedding disk cache unavailable, continuing without it: {e}")
+        return None
@@ -0,0 +1,194 @@
+# embedding_service.py
+
+import os
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))   # how long a request waits for company
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "2000"))
+
+# encode(texts) -> one vector (list of floats) per text
+Encoder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+class Histogram:
+    """Counts per upper bound (the last bucket is open-ended)"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.samples = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "avg": round(self.total / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+class EmbeddingService:
+    """
+    Micro-batches concurrent embedding requests.
+
+    embed() queues the text and returns once its batch is encoded. A batch
+    is sent to the model when it reaches max_batch texts or max_wait_ms after
+    its first text arrived, whichever is first, and is encoded in one forward
+    pass on a dedicated worker thread, so the event loop keeps serving
+    requests meanwhile. Identical texts share one slot in a batch, and recent
+    results are kept in an LRU of cache_size entries. With a `store`
+    (embedding_cache.PersistentEmbeddingCache), LRU misses are looked up on
+    disk by the worker thread as part of their batch, so only texts missing
+    there are encoded, and new embeddings are written there too. The event
+    loop itself only ever touches the in-memory LRU.
+
+    Batches are collected per event loop, so callers running their own loop
+    (vector_search.search_vector_db) work too.
+    """
+
+    def __init__(self, encode: Encoder, max_batch: int = EMBED_MAX_BATCH,
+                 max_wait_ms: float = EMBED_MAX_WAIT_MS, cache_size: int = EMBED_CACHE_SIZE,
+                 store: Optional[Any] = None):
+        self.encode = encode
+        self.store = store
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # loop -> (texts -> waiting futures, first enqueue time, flush timer)
+        self._pending: Dict[asyncio.AbstractEventLoop, Tuple[Dict[str, List[asyncio.Future]], float, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        # Metrics
+        self.requests = 0
+        self.cache_hits = 0
+        self.store_hits = 0
+        self.batches = 0
+        self.errors = 0
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 2, 5, 10, 20, 50])
+        self.encode_ms = Histogram([5, 10, 20, 50, 100, 200])
+
+    def _cached(self, text: str):
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _remember(self, text: str, vector: List[float]):
+        with self._lock:
+            self._cache[text] = vector
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def warm(self, entries: Iterable[Tuple[str, List[float]]]) -> int:
+        """Preload (text, vector) pairs into the in-memory LRU"""
+        count = 0
+        for text, vector in entries:
+            self._remember(text, vector)
+            count += 1
+        return count
+
+    async def embed(self, text: str) -> List[float]:
+        self.requests += 1
+        vector = self._cached(text)
+        if vector is not None:
+            self.cache_hits += 1
+            return vector
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            batch = self._pending.get(loop)
+            if batch is None:
+                timer = loop.call_later(self.max_wait, self._flush, loop)
+                batch = self._pending[loop] = ({}, time.monotonic(), timer)
+            batch[0].setdefault(text, []).append(future)
+            full = len(batch[0]) >= self.max_batch
+        if full:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        """Send the loop's pending batch to the worker thread"""
+        with self._lock:
+            batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        waiting, first_enqueued, timer = batch
+        timer.cancel()
+        self.batches += 1
+        self.batch_sizes.observe(len(waiting))
+        self.queue_wait_ms.observe((time.monotonic() - first_enqueued) * 1000)
+        texts = list(waiting)
+        task = loop.run_in_executor(self._executor, self._encode, texts)
+        task.add_done_callback(lambda done: self._resolve(waiting, texts, done))
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """On the worker thread: disk-cache lookups, then one forward pass for the rest"""
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        if self.store is not None:
+            for index, text in enumerate(texts):
+                try:
+                    vectors[index] = self.store.get(text)
+                except Exception as e:  # the cache is an optimisation; never fail the query
+                    print(f"[ERROR] Embedding disk cache read failed: {e}")
+            self.store_hits += sum(vector is not None for vector in vectors)
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return vectors
+        started = time.perf_counter()
+        encoded = self.encode([texts[index] for index in missing])
+        self.encode_ms.observe((time.perf_counter() - started) * 1000)
+        for index, vector in zip(missing, encoded):
+            vectors[index] = list(map(float, vector))
+            if self.store is not None:
+                try:
+                    self.store.put(texts[index], vectors[index])
+                except Exception as e:
+                    print(f"[ERROR] Embedding disk cache write failed: {e}")
+        return vectors
+
+    def _resolve(self, waiting: Dict[str, List[asyncio.Future]], texts: List[str], done: asyncio.Future):
+        error = done.exception()
+        if error is not None:
+            self.errors += 1
+        for index, text in enumerate(texts):
+            if error is None:
+                self._remember(text, done.result()[index])
+            for future in waiting[text]:
+                if future.done():  # caller was cancelled
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[index])
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "store_hits": self.store_hits,
+            "store": self.store.get_stats() if self.store is not None else None,
+            "batches": self.batches,
+            "errors": self.errors,
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            "encode_ms": self.encode_ms.to_dict(),
+        }
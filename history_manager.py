@@ -0,0 +1,169 @@
+# history_manager.py
+
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_client import LLM_MODEL
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))        # tokens of past turns sent per request
+HISTORY_TOOL_RESULT_MAX_TOKENS = int(os.getenv("HISTORY_TOOL_RESULT_MAX_TOKENS", "300"))
+HISTORY_SUMMARY_MAX_CHARS = 1200  # cap on the note describing dropped turns
+
+# Keys the chat API accepts on a message; anything else (timestamps) is dropped
+MESSAGE_KEYS = ("role", "content", "name", "tool_calls", "tool_call_id")
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators, per message
+
+_encoding = None
+_encoding_loaded = False
+
+history_stats = {
+    "compactions": 0,
+    "tokens_before": 0,
+    "tokens_after": 0,
+    "turns_dropped": 0,
+    "tool_results_truncated": 0,
+}
+
+
+def _get_encoding():
+    """tiktoken encoding for LLM_MODEL if tiktoken is installed, else None"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(LLM_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # not installed, or encoding files unavailable
+            print(f"[DEBUG] tiktoken unavailable ({e}); estimating tokens from length")
+    return _encoding
+
+
+def count_text_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_text_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def count_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(count_message_tokens(message) for message in messages)
+
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        head = encoding.decode(tokens[:max_tokens])
+    else:
+        if len(text) <= max_tokens * 4:
+            return text
+        head = text[:max_tokens * 4]
+    return head + " …[truncated]"
+
+
+def _split_turns(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group messages into turns, each starting at a user message"""
+    turns: List[List[Dict[str, Any]]] = []
+    for message in messages:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _summarize(turns: List[List[Dict[str, Any]]], previous: Optional[str]) -> str:
+    """Short extractive note of what the dropped turns were about"""
+    lines = [previous] if previous else []
+    for turn in turns:
+        asked = next((m.get("content") for m in turn if m["role"] == "user" and m.get("content")), None)
+        tools = sorted({call["function"]["name"] for m in turn for call in m.get("tool_calls") or []})
+        if asked:
+            line = f"- User: {asked[:150]}"
+            if tools:
+                line += f" (tools used: {', '.join(tools)})"
+            lines.append(line)
+    # Keep the most recent lines that fit
+    kept, size = [], 0
+    for line in reversed("\n".join(lines).split("\n")):
+        size += len(line) + 1
+        if size > HISTORY_SUMMARY_MAX_CHARS:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+def compact_history(messages: List[Dict[str, Any]], budget: int = HISTORY_TOKEN_BUDGET,
+                    summary: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fit past conversation into `budget` tokens.
+
+    System messages are dropped (the prompt is rebuilt every turn), unknown
+    keys are stripped, and tool results are cut to
+    HISTORY_TOOL_RESULT_MAX_TOKENS. If that is not enough, whole turns are
+    dropped oldest first (so tool calls stay paired with their results) and
+    folded into a short summary. The newest turn is always kept.
+    Returns (messages, summary), the given summary extended with any dropped turns.
+    """
+    tokens_before = count_tokens(messages)
+    compacted: List[Dict[str, Any]] = []
+    for message in messages:
+        if message.get("role") == "system":
+            continue
+        message = {key: message[key] for key in MESSAGE_KEYS if key in message}
+        if message["role"] in ("tool", "function") and message.get("content"):
+            content = _truncate_text(message["content"], HISTORY_TOOL_RESULT_MAX_TOKENS)
+            if content is not message["content"]:
+                history_stats["tool_results_truncated"] += 1
+            message["content"] = content
+        compacted.append(message)
+
+    turns = _split_turns(compacted)
+    # Tool results without their call (history paged mid-turn) are invalid
+    while turns and turns[0][0]["role"] == "tool":
+        turns.pop(0)
+    turn_tokens = [count_tokens(turn) for turn in turns]
+    total = sum(turn_tokens)
+    dropped = 0
+    while len(turns) - dropped > 1 and total > budget:
+        total -= turn_tokens[dropped]
+        dropped += 1
+    if dropped:
+        summary = _summarize(turns[:dropped], summary)
+    result = [message for turn in turns[dropped:] for message in turn]
+
+    history_stats["compactions"] += 1
+    history_stats["tokens_before"] += tokens_before
+    history_stats["tokens_after"] += count_tokens(result)
+    history_stats["turns_dropped"] += dropped
+    return result, summary
+
+
+def summary_message(summary: Optional[str]) -> List[Dict[str, str]]:
+    """System message carrying the summary of dropped turns (empty if none)"""
+    if not summary:
+        return []
+    return [{"role": "system", "content": f"Summary of earlier conversation:\n{summary}"}]
+
+
+def get_history_stats() -> Dict[str, Any]:
+    return {
+        **history_stats,
+        "budget": HISTORY_TOKEN_BUDGET,
+        "tokens_saved": history_stats["tokens_before"] - history_stats["tokens_after"],
+        "tokenizer": "tiktoken" if _get_encoding() is not None else "estimate",
+    }
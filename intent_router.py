@@ -0,0 +1,121 @@
+# intent_router.py
+
+import os
+import re
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1") != "0"
+
+PHONE_RE = re.compile(r"^(?:\+?91|0)?([6-9]\d{9})$")
+OTP_RE = re.compile(r"^(\d{4,6})$")
+ORDERS_RE = re.compile(
+    r"^(?:please\s+)?(?:(?:show|view|see|check|get|list|fetch|display)\s+)?(?:me\s+)?"
+    r"(?:all\s+)?(?:my\s+)?(?:(?:past|previous|recent|all)\s+)?orders?(?:\s+history)?(?:\s+please)?$"
+)
+
+router_stats = {
+    "routed": {"phone": 0, "otp": 0, "orders": 0},
+    "fallthrough": 0,
+    "disabled": 0,
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    """A tool call the router makes on the model's behalf"""
+    name: str              # rule that matched (counter key)
+    tool: str
+    args: Dict[str, Any]
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"[^\w\s+]", "", message.lower()).strip()
+
+
+def _last_tool_call(history: List[Dict[str, Any]]):
+    """(name, arguments, result) of the most recent tool call in history, or None"""
+    results = {}
+    for message in reversed(history):
+        if message.get("role") == "tool":
+            results[message.get("tool_call_id")] = message.get("content")
+        elif message.get("tool_calls"):
+            call = message["tool_calls"][-1]
+            try:
+                args = json.loads(call["function"].get("arguments") or "{}")
+                result = json.loads(results.get(call.get("id")) or "null")
+            except json.JSONDecodeError:
+                return None
+            return call["function"]["name"], args, result
+    return None
+
+
+def _succeeded(result: Any) -> bool:
+    if not isinstance(result, dict):
+        return False
+    if result.get("status") == "error":
+        return False
+    return result.get("error") in (None, "0", 0, False)
+
+
+def _auth_token(history: List[Dict[str, Any]], session_token: Optional[str]) -> Optional[str]:
+    """The session's portal token, else the one returned by the agent's last sign_in"""
+    if session_token:
+        return session_token
+    calls = {}
+    for message in history:
+        for call in message.get("tool_calls") or []:
+            calls[call.get("id")] = call["function"]["name"]
+    for message in reversed(history):
+        if message.get("role") == "tool" and calls.get(message.get("tool_call_id")) == "sign_in":
+            try:
+                result = json.loads(message.get("content") or "null")
+            except json.JSONDecodeError:
+                return None
+            data = result.get("data") if isinstance(result, dict) else None
+            return data.get("auth_token") if isinstance(data, dict) else None
+    return None
+
+
+def route(message: str, history: List[Dict[str, Any]], session_id: str,
+          logged_in: bool, session_token: Optional[str] = None) -> Optional[Route]:
+    """
+    Tool call implied by an unambiguous message, or None to let the model plan:
+      - a bare phone number before login       -> check_user
+      - a 4-6 digit code right after send_otp  -> sign_in with that OTP
+      - "show my orders" once a token is known -> get_orders
+    The model still phrases the result (and may call further tools).
+    """
+    if not INTENT_ROUTER_ENABLED:
+        router_stats["disabled"] += 1
+        return None
+    text = _normalize(message)
+    compact = re.sub(r"[\s-]", "", text)
+
+    phone = PHONE_RE.match(compact)
+    if phone and not logged_in:
+        router_stats["routed"]["phone"] += 1
+        return Route("phone", "check_user", {"phone": phone.group(1)})
+
+    otp = OTP_RE.match(compact)
+    if otp and not logged_in:
+        last = _last_tool_call(history)
+        if last and last[0] == "send_otp" and last[1].get("phone") and _succeeded(last[2]):
+            router_stats["routed"]["otp"] += 1
+            return Route("otp", "sign_in", {
+                "phone": last[1]["phone"], "password": otp.group(1), "session_id": session_id
+            })
+
+    if ORDERS_RE.match(text):
+        token = _auth_token(history, session_token)
+        if token:
+            router_stats["routed"]["orders"] += 1
+            return Route("orders", "get_orders", {"auth_token": token})
+
+    router_stats["fallthrough"] += 1
+    return None
+
+
+def get_router_stats() -> Dict[str, Any]:
+    return {**router_stats, "enabled": INTENT_ROUTER_ENABLED}
@@ -0,0 +1,92 @@
+# json_stream.py
+
+import re
+
+ANSWER_KEY_RE = re.compile(r'"answer"\s*:\s*"')
+
+_ESCAPES = {
+    '"': '"', '\\': '\\', '/': '/',
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+}
+
+
+class AnswerStreamExtractor:
+    """
+    Incrementally pull the value of the "answer" field out of a JSON reply
+    that is still being generated, e.g.
+
+        {"status": "success", "data": {"answer": "Hello th
+
+    feed() takes the next chunk of raw model output and returns whatever new
+    answer text became available, so it can be forwarded to the browser
+    before the JSON envelope is complete. Escapes split across chunks are
+    held back until they can be decoded.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_answer = False
+        self.done = False
+        self.answer = ""
+
+    def feed(self, chunk: str) -> str:
+        if self.done or not chunk:
+            return ""
+        self._buffer += chunk
+
+        if not self._in_answer:
+            match = ANSWER_KEY_RE.search(self._buffer)
+            if not match:
+                # Keep enough tail to match a key split across chunks
+                self._buffer = self._buffer[-32:]
+                return ""
+            self._in_answer = True
+            self._buffer = self._buffer[match.end():]
+
+        out = []
+        buf, i, n = self._buffer, 0, len(self._buffer)
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence: wait for the whole thing
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc == 'u':
+                if i + 6 > n:
+                    break
+                try:
+                    code = int(buf[i + 2:i + 6], 16)
+                except ValueError:
+                    code = 0xFFFD
+                # Surrogate pair (emoji and other astral characters)
+                if 0xD800 <= code < 0xDC00:
+                    if i + 12 > n:
+                        break
+                    if buf[i + 6:i + 8] == '\\u':
+                        try:
+                            low = int(buf[i + 8:i + 12], 16)
+                        except ValueError:
+                            low = 0
+                        if 0xDC00 <= low < 0xE000:
+                            out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                            i += 12
+                            continue
+                out.append(chr(code))
+                i += 6
+            else:
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+
+        # Drop the consumed prefix so the buffer stays small
+        self._buffer = buf[i:]
+        text = "".join(out)
+        self.answer += text
+        return text
@@ -0,0 +1,86 @@
+# llm_client.py
+
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from openai import AsyncOpenAI
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "200"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_in_flight = 0
+_waiting = 0
+
+
+def get_client() -> AsyncOpenAI:
+    """Lazily create the shared async OpenAI client"""
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=LLM_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return _client
+
+
+@asynccontextmanager
+async def _slot():
+    """Hold one of the LLM_MAX_CONCURRENCY call slots"""
+    global _in_flight, _waiting
+    _waiting += 1
+    try:
+        await _semaphore.acquire()
+    finally:
+        _waiting -= 1
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        _semaphore.release()
+
+
+async def stream_chat_completion(timeout: Optional[float] = None, **kwargs) -> AsyncIterator[Any]:
+    """
+    Run one streaming chat completion without blocking the event loop,
+    yielding completion chunks. At most LLM_MAX_CONCURRENCY calls are in
+    flight per worker; callers beyond that wait their turn. The slot is held
+    until the stream is fully consumed or closed, and cancelling the consuming
+    task (e.g. when the HTTP client disconnects) aborts the underlying request.
+    """
+    kwargs.setdefault("model", LLM_MODEL)
+    async with _slot():
+        stream = await get_client().chat.completions.create(
+            stream=True,
+            timeout=timeout or LLM_TIMEOUT,
+            **kwargs
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.response.aclose()
+
+
+def get_stats() -> Dict[str, Any]:
+    """Current concurrency usage of the LLM client"""
+    return {
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "in_flight": _in_flight,
+        "waiting": _waiting,
+    }
+
+
+async def close():
+    """Close the shared client (called on application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
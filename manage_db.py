@@ -6,11 +6,11 @@ Database management script for the chatbot
 import argparse
 from memory.database import db_manager
 from memory.memory_store import cleanup_old_data
-import sqlite3
+from memory.sqlite_pool import get_connection
 
 def show_stats():
     """Show database statistics"""
-    with sqlite3.connect(db_manager.db_path) as conn:
+    with get_connection(db_manager.db_path) as conn:
         cursor = conn.cursor()
         
         # Count users
@@ -52,7 +52,7 @@ def cleanup_old_sessions(days=7):
 
 def show_recent_users(limit=10):
     """Show recent users"""
-    with sqlite3.connect(db_manager.db_path) as conn:
+    with get_connection(db_manager.db_path) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT phone, created_at, last_login 
@@ -95,6 +95,7 @@ def main():
                        help="Session ID for session details")
     
     args = parser.parse_args()
+    db_manager.init_database()
     
     if args.command == "stats":
         show_stats()
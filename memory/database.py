@@ -4,59 +4,23 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import os
 
+from .sqlite_pool import get_connection
+from .migrations import migrate, CHAT_DB_MIGRATIONS
+from .write_behind import write_journal
+
+MAX_ROWID = 2 ** 63 - 1
+
 class DatabaseManager:
     def __init__(self, db_path: str = "chatbot.db"):
         self.db_path = db_path
-        self.init_database()
     
     def init_database(self):
-        """Initialize the database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    phone TEXT UNIQUE NOT NULL,
-                    auth_token TEXT,
-                    user_data TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create sessions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT UNIQUE NOT NULL,
-                    user_id INTEGER,
-                    auth_token TEXT,
-                    phone TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            # Create chat_history table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES sessions (session_id)
-                )
-            ''')
-            
-            conn.commit()
+        """Bring the database schema up to date (run once at startup)"""
+        migrate(self.db_path, CHAT_DB_MIGRATIONS)
     
     def create_or_update_user(self, phone: str, auth_token: str, user_data: Dict = None) -> int:
         """Create or update a user record"""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             
             # Check if user exists
@@ -82,7 +46,7 @@ class DatabaseManager:
     def create_session(self, session_id: str, user_id: int = None, auth_token: str = None, phone: str = None) -> bool:
         """Create a new session"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO sessions (session_id, user_id, auth_token, phone)
@@ -96,7 +60,7 @@ class DatabaseManager:
     def update_session_auth(self, session_id: str, user_id: int, auth_token: str, phone: str) -> bool:
         """Update session with authentication data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE sessions 
@@ -110,7 +74,7 @@ class DatabaseManager:
     
     def get_session_data(self, session_id: str) -> Optional[Dict]:
         """Get session data including user info if authenticated"""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.session_id, s.user_id, s.auth_token, s.phone, 
@@ -138,30 +102,31 @@ class DatabaseManager:
         return session_data is not None and session_data.get("auth_token") is not None
     
     def add_chat_message(self, session_id: str, role: str, content: str) -> bool:
-        """Add a chat message to history"""
+        """Add a chat message to history (batched by the write-behind journal)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO chat_history (session_id, role, content)
-                    VALUES (?, ?, ?)
-                ''', (session_id, role, content))
-                return True
+            write_journal.enqueue(self.db_path, '''
+                INSERT INTO chat_history (session_id, role, content)
+                VALUES (?, ?, ?)
+            ''', (session_id, role, content))
+            return True
         except Exception as e:
             print(f"Error adding chat message: {e}")
             return False
     
-    def get_chat_history(self, session_id: str, limit: int = 50) -> List[Dict]:
-        """Get chat history for a session"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_chat_history(self, session_id: str, limit: int = 50, before_id: Optional[int] = None) -> List[Dict]:
+        """
+        Get the latest `limit` messages of a session (keyset-paged by before_id).
+        Callers on the event loop `await write_journal.wait_written()` first.
+        """
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT role, content, timestamp
                 FROM chat_history
-                WHERE session_id = ?
-                ORDER BY timestamp DESC
+                WHERE session_id = ? AND id < ?
+                ORDER BY id DESC
                 LIMIT ?
-            ''', (session_id, limit))
+            ''', (session_id, before_id if before_id is not None else MAX_ROWID, limit))
             
             history = []
             for row in cursor.fetchall():
@@ -175,16 +140,14 @@ class DatabaseManager:
             return list(reversed(history))
     
     def update_session_activity(self, session_id: str) -> bool:
-        """Update last activity timestamp for a session"""
+        """Update last activity timestamp for a session (batched by the write-behind journal)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE sessions 
-                    SET last_activity = CURRENT_TIMESTAMP
-                    WHERE session_id = ?
-                ''', (session_id,))
-                return True
+            write_journal.enqueue(self.db_path, '''
+                UPDATE sessions 
+                SET last_activity = CURRENT_TIMESTAMP
+                WHERE session_id = ?
+            ''', (session_id,))
+            return True
         except Exception as e:
             print(f"Error updating session activity: {e}")
             return False
@@ -192,7 +155,7 @@ class DatabaseManager:
     def cleanup_old_sessions(self, days_old: int = 7) -> int:
         """Clean up old sessions and their chat history"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with get_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 # Delete old chat history
@@ -1,12 +1,97 @@
 # memory/memory_store.py
 
 from .database import db_manager
-from typing import Dict, List
+from .session_store import create_session_store
+from .write_behind import write_journal
+from typing import Any, Callable, Dict, List, Optional
 
-# In-memory storage for anonymous users (fallback)
-_session_memory = {}
+# Storage for anonymous users (fallback): bounded in-process LRU, or Redis
+# when SESSION_STORE=redis so several workers share sessions
+_session_memory = create_session_store()
 
-def get_session_memory(session_id: str) -> Dict:
+
+class SessionContext:
+    """
+    Everything one request needs to know about a session, loaded once.
+
+    load_session() runs a single joined sessions/users lookup; memory
+    (load_memory()) and any extra per-request fields (see lazy()) are only
+    fetched when first used.
+    Chat messages added during the request are held back and written in
+    commit(), which the endpoint calls once the turn is over.
+    """
+
+    def __init__(self, session_id: str, session_data: Optional[Dict]):
+        self.session_id = session_id
+        self.session_data = session_data or {}
+        self._memory: Optional[Dict] = None
+        self._history_at_load: Optional[List] = None
+        self._lazy: Dict[str, Any] = {}
+        self._pending_messages: List[Dict] = []
+
+    @property
+    def is_authenticated(self) -> bool:
+        return bool(self.session_data.get("auth_token"))
+
+    @property
+    def auth_token(self) -> Optional[str]:
+        return self.session_data.get("auth_token")
+
+    @property
+    def phone(self) -> Optional[str]:
+        return self.session_data.get("phone")
+
+    async def load_memory(self) -> Dict:
+        """Session memory, as get_session_memory() returns it (loaded on first call)"""
+        if self._memory is None:
+            if self.is_authenticated:
+                await write_journal.wait_written()  # read our own queued history writes
+                self._memory = {
+                    "history": db_manager.get_chat_history(self.session_id),
+                    "auth_token": self.session_data["auth_token"],
+                    "phone": self.session_data["phone"],
+                    "user_data": self.session_data["user_data"],
+                    "user_id": self.session_data["user_id"],
+                    "is_authenticated": True
+                }
+            else:
+                self._memory = await _session_memory.setdefault(
+                    self.session_id, {"history": [], "is_authenticated": False}
+                )
+            self._history_at_load = self._memory.get("history")
+        return self._memory
+
+    def lazy(self, name: str, loader: Callable[[], Any]) -> Any:
+        """Per-request memo: run loader() the first time `name` is asked for"""
+        if name not in self._lazy:
+            self._lazy[name] = loader()
+        return self._lazy[name]
+
+    def add_chat_message(self, role: str, content: str):
+        """Record a chat message; written back by commit()"""
+        self._pending_messages.append({"role": role, "content": content, "timestamp": None})
+
+    async def commit(self) -> bool:
+        """Write back the messages and activity of this request"""
+        messages, self._pending_messages = self._pending_messages, []
+        if self.is_authenticated:
+            for message in messages:
+                db_manager.add_chat_message(self.session_id, message["role"], message["content"])
+            return db_manager.update_session_activity(self.session_id)
+        memory = await self.load_memory()
+        # The agent replaces memory["history"] with the full turn when it
+        # succeeds; only append our messages if it did not.
+        if memory.get("history") is self._history_at_load:
+            memory.setdefault("history", []).extend(messages)
+        await _session_memory.set(self.session_id, memory)
+        return True
+
+
+def load_session(session_id: str) -> SessionContext:
+    """Load the request-scoped context for session_id (one query)"""
+    return SessionContext(session_id, db_manager.get_session_data(session_id))
+
+async def get_session_memory(session_id: str) -> Dict:
     """
     Get session memory from database if authenticated, otherwise from in-memory storage.
     Only authenticated users get persistent storage.
@@ -16,6 +101,7 @@ def get_session_memory(session_id: str) -> Dict:
     
     if session_data and session_data.get("auth_token"):
         # User is authenticated - use database storage
+        await write_journal.wait_written()
         history = db_manager.get_chat_history(session_id)
         return {
             "history": history,
@@ -27,11 +113,9 @@ def get_session_memory(session_id: str) -> Dict:
         }
     else:
         # Anonymous user - use in-memory storage
-        if session_id not in _session_memory:
-            _session_memory[session_id] = {"history": [], "is_authenticated": False}
-        return _session_memory[session_id]
+        return await _session_memory.setdefault(session_id, {"history": [], "is_authenticated": False})
 
-def update_session_memory(session_id: str, memory: Dict) -> bool:
+async def update_session_memory(session_id: str, memory: Dict) -> bool:
     """
     Update session memory. For authenticated users, save to database.
     For anonymous users, update in-memory storage.
@@ -42,10 +126,10 @@ def update_session_memory(session_id: str, memory: Dict) -> bool:
         return True
     else:
         # Update in-memory storage for anonymous users
-        _session_memory[session_id] = memory
+        await _session_memory.set(session_id, memory)
         return True
 
-def add_chat_message(session_id: str, role: str, content: str) -> bool:
+async def add_chat_message(session_id: str, role: str, content: str) -> bool:
     """
     Add a chat message to history. For authenticated users, save to database.
     For anonymous users, add to in-memory storage.
@@ -57,17 +141,16 @@ def add_chat_message(session_id: str, role: str, content: str) -> bool:
         return db_manager.add_chat_message(session_id, role, content)
     else:
         # Add to in-memory storage for anonymous users
-        if session_id not in _session_memory:
-            _session_memory[session_id] = {"history": [], "is_authenticated": False}
-        
-        _session_memory[session_id]["history"].append({
+        memory = await _session_memory.setdefault(session_id, {"history": [], "is_authenticated": False})
+        memory["history"].append({
             "role": role,
             "content": content,
             "timestamp": None  # In-memory doesn't track timestamps
         })
+        await _session_memory.set(session_id, memory)
         return True
 
-def authenticate_user(session_id: str, phone: str, auth_token: str, user_data: Dict = None) -> bool:
+async def authenticate_user(session_id: str, phone: str, auth_token: str, user_data: Dict = None) -> bool:
     """
     Authenticate a user and migrate their data to database storage.
     """
@@ -79,14 +162,13 @@ def authenticate_user(session_id: str, phone: str, auth_token: str, user_data: D
         success = db_manager.update_session_auth(session_id, user_id, auth_token, phone)
         
         if success:
-            # Migrate any existing in-memory history to database
-            if session_id in _session_memory:
-                history = _session_memory[session_id].get("history", [])
+            # Migrate any existing in-memory history to database,
+            # removing it from in-memory storage
+            memory = await _session_memory.pop(session_id)
+            if memory is not None:
+                history = memory.get("history", [])
                 for message in history:
                     db_manager.add_chat_message(session_id, message["role"], message["content"])
-                
-                # Remove from in-memory storage
-                del _session_memory[session_id]
         
         return success
     except Exception as e:
@@ -97,6 +179,17 @@ def is_authenticated(session_id: str) -> bool:
     """Check if a session is authenticated"""
     return db_manager.is_authenticated(session_id)
 
+async def start_session_store():
+    """Start the session store's background work (in-memory expiry sweeper)"""
+    await _session_memory.start()
+
+async def stop_session_store():
+    await _session_memory.stop()
+
+def get_memory_stats() -> Dict[str, Any]:
+    """Backend and hit/eviction counters of the anonymous session memory store"""
+    return _session_memory.get_stats()
+
 def cleanup_old_data(days_old: int = 7) -> int:
     """Clean up old sessions and data"""
     return db_manager.cleanup_old_sessions(days_old) 
\ No newline at end of file
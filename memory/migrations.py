@@ -0,0 +1,230 @@
+# memory/migrations.py
+
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from .sqlite_pool import get_connection
+
+# A migration is (version, description, steps); each step is either an SQL
+# statement or a callable taking the connection (for data backfills).
+# Versions must increase; never edit a migration that has shipped, add a new one.
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+Migration = Tuple[int, str, List[Step]]
+
+# chat_history.db (agentic_ai)
+AGENT_DB_MIGRATIONS: List[Migration] = [
+    (1, "session, history and tickets tables", [
+        """
+        CREATE TABLE IF NOT EXISTS session (
+            session_id TEXT PRIMARY KEY,
+            is_logged_in BOOLEAN DEFAULT 0,
+            user_phone TEXT,
+            user_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tool_name TEXT,
+            tool_args TEXT,
+            tool_response TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            message_index INTEGER,
+            FOREIGN KEY (session_id) REFERENCES session(session_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            ticket_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            user_phone TEXT,
+            issue_description TEXT NOT NULL,
+            product_info TEXT,
+            troubleshooting_steps TEXT,
+            status TEXT DEFAULT 'open',
+            priority TEXT DEFAULT 'medium',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # History is read per session, newest first, by rowid. With this index a
+    # lookup is O(log n + limit) instead of a scan of every session's rows.
+    (2, "index history by (session_id, id)", [
+        "CREATE INDEX IF NOT EXISTS idx_history_session_id ON history (session_id, id)",
+    ]),
+    # One row per session for the admin listing, kept current by a trigger on
+    # history so the page never aggregates the whole history table.
+    # last_message_id is monotonic and unique, so it doubles as the keyset
+    # pagination key for "most recently active first".
+    (3, "session_summary table maintained on history insert", [
+        """
+        CREATE TABLE IF NOT EXISTS session_summary (
+            session_id TEXT PRIMARY KEY,
+            first_seen TIMESTAMP,
+            last_seen TIMESTAMP,
+            last_message_id INTEGER NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            user_phone TEXT,
+            escalated INTEGER NOT NULL DEFAULT 0,
+            frustrated INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO session_summary
+            (session_id, first_seen, last_seen, last_message_id, message_count, user_phone)
+        SELECT h.session_id, MIN(h.timestamp), MAX(h.timestamp), MAX(h.id), COUNT(*),
+               (SELECT s.user_phone FROM session s WHERE s.session_id = h.session_id)
+        FROM history h
+        GROUP BY h.session_id
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_history_session_summary
+        AFTER INSERT ON history
+        BEGIN
+            INSERT INTO session_summary (session_id, first_seen, last_seen, last_message_id, message_count)
+            VALUES (NEW.session_id, NEW.timestamp, NEW.timestamp, NEW.id, 1)
+            ON CONFLICT(session_id) DO UPDATE SET
+                last_seen = excluded.last_seen,
+                last_message_id = excluded.last_message_id,
+                message_count = message_count + 1;
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_session_summary_last_message ON session_summary (last_message_id)",
+        """
+        CREATE INDEX IF NOT EXISTS idx_session_summary_escalated
+        ON session_summary (last_message_id) WHERE escalated = 1
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_session_summary_phone ON session_summary (user_phone, last_message_id)",
+    ]),
+]
+
+# chatbot.db (memory.database.DatabaseManager)
+CHAT_DB_MIGRATIONS: List[Migration] = [
+    (1, "users, sessions and chat_history tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone TEXT UNIQUE NOT NULL,
+            auth_token TEXT,
+            user_data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT UNIQUE NOT NULL,
+            user_id INTEGER,
+            auth_token TEXT,
+            phone TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+        )
+        """,
+    ]),
+    (2, "index chat_history by (session_id, id) and sessions by last_activity", [
+        "CREATE INDEX IF NOT EXISTS idx_chat_history_session_id ON chat_history (session_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity)",
+    ]),
+]
+
+# tickets.db (tools.raise_ticket)
+TICKETS_DB_MIGRATIONS: List[Migration] = [
+    (1, "tickets table", [
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            phone TEXT,
+            name TEXT,
+            problem TEXT,
+            order_id TEXT,
+            invoice_no TEXT
+        )
+        """,
+    ]),
+]
+
+# embedding_cache/index.db (embedding_cache.PersistentEmbeddingCache)
+EMBEDDING_CACHE_MIGRATIONS: List[Migration] = [
+    (1, "embedding_cache slot index", [
+        """
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            key_hash TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            slot INTEGER NOT NULL UNIQUE,
+            hits INTEGER NOT NULL DEFAULT 0,
+            last_used REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)",
+        "CREATE INDEX IF NOT EXISTS idx_embedding_cache_hits ON embedding_cache (hits)",
+    ]),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Highest applied migration version (0 for a fresh database)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(db_path: str, migrations: List[Migration]) -> int:
+    """
+    Apply pending migrations to db_path, each in its own transaction.
+    Safe to run from several workers at once: BEGIN IMMEDIATE serialises
+    them and the version is re-checked under the lock.
+    Returns the resulting schema version.
+    """
+    conn = get_connection(db_path)
+    version = get_schema_version(conn)
+    for target, description, steps in sorted(migrations, key=lambda m: m[0]):
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if target <= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (target, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[MIGRATION] {db_path}: applied v{target} ({description})")
+        version = target
+    return version
@@ -0,0 +1,133 @@
+# memory/redis_store.py
+
+import os
+import json
+import math
+import zlib
+from typing import Any, Dict, Optional
+
+from .session_store import SessionStore
+from .ttl_store import SESSION_MEMORY_TTL
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("REDIS_KEY_PREFIX", "lotus:session:")
+REDIS_COMPRESS_MIN_BYTES = int(os.getenv("REDIS_COMPRESS_MIN_BYTES", "1024"))
+
+# One-byte tag in front of every stored value
+_RAW = b"j"
+_ZLIB = b"z"
+
+
+def encode(memory: Dict) -> bytes:
+    """Compact JSON, zlib-compressed once it is worth it"""
+    data = json.dumps(memory, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(data) >= REDIS_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(data, 1)
+    return _RAW + data
+
+
+def decode(blob: bytes) -> Dict:
+    tag, data = blob[:1], blob[1:]
+    if tag == _ZLIB:
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session memory shared by every worker through Redis.
+
+    Each session is one key holding the encoded memory dict, expiring after
+    SESSION_MEMORY_TTL idle seconds. Reads refresh the TTL in the same
+    pipelined round trip. Uses the asyncio client, so a round trip never
+    blocks the event loop. Pass `client` to use an existing
+    redis.asyncio.Redis-compatible client (e.g. fakeredis.FakeAsyncRedis()
+    locally).
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str = REDIS_URL, client: Any = None,
+                 ttl: float = SESSION_MEMORY_TTL, key_prefix: str = REDIS_KEY_PREFIX):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("SESSION_STORE=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = math.ceil(ttl) if ttl > 0 else 0  # whole seconds; 0: no expiry, as in BoundedTTLStore
+        self.key_prefix = key_prefix
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+        self.bytes_written = 0
+
+    def _key(self, session_id: str) -> str:
+        return self.key_prefix + session_id
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        key = self._key(session_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(key)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        self.round_trips += 1
+        blob = (await pipe.execute())[0]
+        if blob is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return decode(blob)
+
+    async def set(self, session_id: str, memory: Dict):
+        blob = encode(memory)
+        self.round_trips += 1
+        await self.client.set(self._key(session_id), blob, ex=self.ttl or None)
+        self.bytes_written += len(blob)
+
+    async def setdefault(self, session_id: str, default: Dict) -> Dict:
+        key = self._key(session_id)
+        blob = encode(default)
+        # SET NX and GET in one round trip: whichever worker wrote first wins
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, blob, ex=self.ttl or None, nx=True)
+        pipe.get(key)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        self.round_trips += 1
+        created, stored = (await pipe.execute())[:2]
+        if created:
+            self.misses += 1
+            self.bytes_written += len(blob)
+        else:
+            self.hits += 1
+        return decode(stored) if stored is not None else default
+
+    async def pop(self, session_id: str) -> Optional[Dict]:
+        key = self._key(session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(key)
+        pipe.delete(key)
+        self.round_trips += 1
+        blob, _ = await pipe.execute()
+        return decode(blob) if blob is not None else None
+
+    async def stop(self):
+        try:
+            close = getattr(self.client, "aclose", None) or self.client.close  # aclose() since redis 5.0.1
+            await close()
+        except Exception as e:
+            print(f"[ERROR] Closing Redis session store failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "round_trips": self.round_trips,
+            "bytes_written": self.bytes_written,
+        }
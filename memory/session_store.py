@@ -0,0 +1,89 @@
+# memory/session_store.py
+
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from .ttl_store import BoundedTTLStore
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # "memory" or "redis"
+
+
+class SessionStore(ABC):
+    """
+    Where anonymous session memory lives between requests.
+
+    Authenticated sessions are persisted in SQLite (memory.database), which
+    every worker on the host already shares; this interface covers the
+    per-session memory dict of anonymous users. Values are plain JSON-able
+    dicts, and callers write a dict back with set() after mutating it.
+    Accessors are coroutines so network-backed stores never block the loop.
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, session_id: str, memory: Dict):
+        ...
+
+    @abstractmethod
+    async def pop(self, session_id: str) -> Optional[Dict]:
+        """Remove and return a session's memory (None if absent)"""
+
+    async def setdefault(self, session_id: str, default: Dict) -> Dict:
+        memory = await self.get(session_id)
+        if memory is None:
+            await self.set(session_id, default)
+            memory = default
+        return memory
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store (single worker); bounded LRU with idle TTL"""
+
+    backend = "memory"
+
+    def __init__(self, store: Optional[BoundedTTLStore] = None):
+        self._store = store if store is not None else BoundedTTLStore()
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        return self._store.get(session_id)
+
+    async def set(self, session_id: str, memory: Dict):
+        self._store[session_id] = memory
+
+    async def pop(self, session_id: str) -> Optional[Dict]:
+        return self._store.pop(session_id)
+
+    async def setdefault(self, session_id: str, default: Dict) -> Dict:
+        return self._store.setdefault(session_id, default)
+
+    async def start(self):
+        await self._store.start()
+
+    async def stop(self):
+        await self._store.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, **self._store.get_stats()}
+
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    """Session store selected by SESSION_STORE"""
+    if backend == "redis":
+        from .redis_store import RedisSessionStore
+        return RedisSessionStore()
+    if backend == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown SESSION_STORE: {backend!r} (expected 'memory' or 'redis')")
@@ -0,0 +1,74 @@
+# memory/sqlite_pool.py
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+# Tuning (override via environment)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")     # safe with WAL
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+
+_local = threading.local()
+_all_connections: List[sqlite3.Connection] = []
+_all_lock = threading.Lock()
+_generation = 0  # bumped by close_all() so threads drop stale connections
+
+
+def _open(path: str) -> sqlite3.Connection:
+    """Open and tune a new connection"""
+    conn = sqlite3.connect(
+        path,
+        timeout=SQLITE_BUSY_TIMEOUT,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # only so close_all() can run at shutdown
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Return the calling thread's pooled connection to db_path, opening it on
+    first use. Connections are never closed by callers: use `with conn:` to
+    wrap writes in a transaction (commit on success, rollback on error).
+    Rows are sqlite3.Row, so both row["col"] and row[0] work.
+    """
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", None)
+    if connections is None or _local.generation != _generation:
+        connections = _local.connections = {}
+        _local.generation = _generation
+    key = os.path.abspath(db_path)
+    conn = connections.get(key)
+    if conn is None:
+        conn = connections[key] = _open(key)
+        with _all_lock:
+            _all_connections.append(conn)
+    return conn
+
+
+def close_all():
+    """Close every pooled connection (application shutdown)"""
+    global _generation
+    with _all_lock:
+        _generation += 1
+        for conn in _all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _all_connections.clear()
+
+
+def get_stats() -> Dict[str, int]:
+    """Number of open pooled connections"""
+    with _all_lock:
+        return {"open_connections": len(_all_connections)}
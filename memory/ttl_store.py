@@ -0,0 +1,186 @@
+# memory/ttl_store.py
+
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SESSION_MEMORY_MAX_ENTRIES = int(os.getenv("SESSION_MEMORY_MAX_ENTRIES", "10000"))
+SESSION_MEMORY_MAX_BYTES = int(os.getenv("SESSION_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_MEMORY_TTL = float(os.getenv("SESSION_MEMORY_TTL", "3600"))          # idle seconds before expiry
+SESSION_MEMORY_SWEEP_INTERVAL = float(os.getenv("SESSION_MEMORY_SWEEP_INTERVAL", "60"))
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a JSON-like value in bytes (its serialised length)"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class BoundedTTLStore:
+    """
+    Dict-like LRU store with an idle TTL and entry/byte limits.
+
+    Every read or write refreshes an entry's position and idle timer. When a
+    write takes the store over max_entries or max_bytes, least recently used
+    entries are evicted. Expired entries are dropped on access and by
+    sweep(), which a background task runs every sweep_interval seconds
+    once start() is called.
+
+    Sizes are estimated when an entry is stored; values mutated in place are
+    re-measured the next time they are stored again.
+    """
+
+    def __init__(self, max_entries: int = SESSION_MEMORY_MAX_ENTRIES,
+                 max_bytes: int = SESSION_MEMORY_MAX_BYTES,
+                 ttl: float = SESSION_MEMORY_TTL,
+                 sweep_interval: float = SESSION_MEMORY_SWEEP_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()  # key -> (value, last_access, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl > 0 and now - last_access > self.ttl
+
+    def _remove(self, key: str):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        """(found, value), refreshing the entry; caller holds the lock"""
+        entry = self._data.get(key)
+        now = time.monotonic()
+        if entry is None:
+            self.misses += 1
+            return False, None
+        if self._expired(entry[1], now):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._data[key] = (entry[0], now, entry[2])
+        self._data.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def _store(self, key: str, value: Any):
+        """Insert or replace an entry and evict down to the limits; caller holds the lock"""
+        size = estimate_size(value)
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, time.monotonic(), size)
+        self._bytes += size
+        # Never evict the entry just written, even if it alone exceeds max_bytes
+        while len(self._data) > 1 and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+        return value if found else default
+
+    def setdefault(self, key: str, default: Any) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            self._store(key, default)
+            return default
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            found, value = self._lookup(key)
+        if not found:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        with self._lock:
+            self._store(key, value)
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if key not in self._data:
+                raise KeyError(key)
+            self._remove(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._expired(entry[1], time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def sweep(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # Oldest access first, so stop at the first live entry
+            for key, (_, last_access, _) in list(self._data.items()):
+                if not self._expired(last_access, now):
+                    break
+                self._remove(key)
+                removed += 1
+            self.expirations += removed
+        return removed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                print(f"[DEBUG] Session memory sweep expired {removed} sessions")
+
+    async def start(self):
+        """Start the background sweeper on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "approx_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
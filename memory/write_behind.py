@@ -0,0 +1,224 @@
+# memory/write_behind.py
+
+import os
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sqlite_pool import get_connection
+
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "200"))   # flush when this many rows wait
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "0.2"))  # ... or after this many seconds
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))  # flushes a locked row is retried
+
+
+class WriteBehindJournal:
+    """
+    Buffers INSERT/UPDATE rows and writes them in batches.
+
+    enqueue() only appends to an in-memory list; a background task flushes
+    the list every WRITE_BEHIND_INTERVAL seconds, or as soon as
+    WRITE_BEHIND_MAX_ROWS rows are waiting, running consecutive rows that share
+    a statement through executemany() in one transaction per database.
+    Rows are written in the order they were enqueued.
+
+    If a database is locked, its rows are requeued for the next flush, at most
+    WRITE_BEHIND_MAX_RETRIES times. Any other error is assumed to be caused by
+    a row (missing table, constraint, disk full): the rows are then written one
+    per transaction and the failing ones are logged and dropped, so one bad row
+    cannot hold back the rest of the batch.
+
+    Readers on the event loop call `await wait_written()` first to see their
+    own writes: it waits, in a worker thread, until every row enqueued so far
+    is committed, including rows a background flush has taken but not yet
+    committed.
+
+    Until start() is called (scripts, tests) every enqueue is written through
+    immediately. stop() flushes whatever is left, so nothing is lost on a
+    clean shutdown.
+    """
+
+    def __init__(self, max_rows: int = WRITE_BEHIND_MAX_ROWS, interval: float = WRITE_BEHIND_INTERVAL,
+                 max_retries: int = WRITE_BEHIND_MAX_RETRIES):
+        self.max_rows = max_rows
+        self.interval = interval
+        self.max_retries = max_retries
+        # (db_path, sql, params, failed attempts)
+        self._pending: List[Tuple[str, str, tuple, int]] = []
+        self._writing = 0                    # rows taken by the flush in progress
+        self._lock = threading.Lock()        # guards _pending
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.retried_rows = 0
+        self.dropped_rows = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def unwritten(self) -> int:
+        """Rows queued or being written, i.e. not committed yet"""
+        with self._lock:
+            return len(self._pending) + self._writing
+
+    async def wait_written(self):
+        """Return once every row enqueued so far is committed (read-your-writes)"""
+        if self.unwritten:
+            # flush() waits for a flush in progress, then writes what is left
+            await asyncio.to_thread(self.flush)
+
+    def enqueue(self, db_path: str, sql: str, params: tuple):
+        """Queue one row for db_path"""
+        with self._lock:
+            self._pending.append((db_path, sql, params, 0))
+            depth = len(self._pending)
+            self.max_depth = max(self.max_depth, depth)
+        if self._task is None:
+            self.flush()
+        elif depth >= self.max_rows:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def flush(self) -> int:
+        """Write all queued rows now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._writing = len(batch)
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            written = 0
+            retry: List[List[Tuple[str, str, tuple, int]]] = []
+            for db_path, groups in _group(batch).items():
+                try:
+                    conn = get_connection(db_path)
+                    with conn:
+                        for sql, rows in groups:
+                            conn.executemany(sql, [params for params, _ in rows])
+                    written += sum(len(rows) for _, rows in groups)
+                except Exception as e:
+                    self.flush_errors += 1
+                    if _is_busy(e):
+                        retry.extend(self._retry(db_path, sql, rows, e) for sql, rows in groups)
+                    else:
+                        print(f"[ERROR] Write-behind flush to {db_path} failed, writing rows one by one: {e}")
+                        written += self._write_rows(db_path, groups, retry)
+            with self._lock:
+                self._pending[:0] = [row for rows in retry for row in rows]
+                self._writing = 0
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.rows_written += written
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+            return written
+
+    def _retry(self, db_path: str, sql: str, rows: List[Tuple[tuple, int]],
+               error: Exception) -> List[Tuple[str, str, tuple, int]]:
+        """Rows to requeue after a busy error; those out of retries are dropped"""
+        requeued = []
+        for params, attempts in rows:
+            if attempts + 1 > self.max_retries:
+                self.dropped_rows += 1
+                print(f"[ERROR] Write-behind row for {db_path} dropped after {attempts + 1} attempts: {error}")
+            else:
+                requeued.append((db_path, sql, params, attempts + 1))
+        self.retried_rows += len(requeued)
+        return requeued
+
+    def _write_rows(self, db_path: str, groups: List[Tuple[str, List[Tuple[tuple, int]]]],
+                    retry: List[List[Tuple[str, str, tuple, int]]]) -> int:
+        """Write rows one per transaction, dropping the ones that fail"""
+        written = 0
+        for sql, rows in groups:
+            for params, attempts in rows:
+                try:
+                    conn = get_connection(db_path)
+                    with conn:
+                        conn.execute(sql, params)
+                    written += 1
+                except Exception as e:
+                    if _is_busy(e):
+                        retry.append(self._retry(db_path, sql, [(params, attempts)], e))
+                    else:
+                        self.dropped_rows += 1
+                        print(f"[ERROR] Write-behind row for {db_path} dropped: {e} (sql: {' '.join(sql.split())})")
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                await asyncio.to_thread(self.flush)
+
+    async def start(self):
+        """Start background flushing on the running event loop"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop background flushing and write out everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "retried_rows": self.retried_rows,
+            "dropped_rows": self.dropped_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+        }
+
+
+def _is_busy(error: Exception) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED, the only errors worth retrying"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def _group(batch: List[Tuple[str, str, tuple, int]]) -> Dict[str, List[Tuple[str, List[Tuple[tuple, int]]]]]:
+    """Per database, runs of consecutive rows sharing a statement (order preserved)"""
+    grouped: Dict[str, List[Tuple[str, List[Tuple[tuple, int]]]]] = {}
+    for db_path, sql, params, attempts in batch:
+        runs = grouped.setdefault(db_path, [])
+        if runs and runs[-1][0] == sql:
+            runs[-1][1].append((params, attempts))
+        else:
+            runs.append((sql, [(params, attempts)]))
+    return grouped
+
+
+# Global journal instance
+write_journal = WriteBehindJournal()
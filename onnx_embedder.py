@@ -0,0 +1,111 @@
+# onnx_embedder.py
+
+import os
+import sys
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_model")
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "1") != "0"   # use the int8 model when exported
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))           # 0: onnxruntime default
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbedder:
+    """
+    all-MiniLM-L6-v2 on onnxruntime, without torch or sentence-transformers.
+
+    Reproduces the SentenceTransformer pipeline: tokenize (truncated to
+    MAX_SEQ_LENGTH), transformer, mean pooling over the attention mask, L2
+    normalization. encode() takes and returns what SentenceTransformer.encode
+    does for a list of texts (a float32 array, one row per text).
+    The directory is written by export_onnx().
+    """
+
+    def __init__(self, directory: str = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZED):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(directory, QUANTIZED_MODEL_FILE)
+        if not quantized or not os.path.exists(model_path):
+            model_path = os.path.join(directory, MODEL_FILE)
+        self.model_path = model_path
+        options = onnxruntime.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        feeds: Dict[str, np.ndarray] = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+        mask = feeds["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def export_onnx(model_name: str, directory: str = ONNX_MODEL_DIR, quantize: bool = True) -> List[str]:
+    """
+    Export the SentenceTransformer's transformer and tokenizer to directory
+    (needs torch and sentence-transformers, once); with quantize, also write
+    a dynamically int8-quantized copy. Returns the written model files.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    os.makedirs(directory, exist_ok=True)
+    model.tokenizer.save_pretrained(directory)  # writes tokenizer.json
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                    token_type_ids=token_type_ids)[0]
+
+    sample = model.tokenizer(["warm up sentence"], return_tensors="pt")
+    path = os.path.join(directory, MODEL_FILE)
+    dynamic = {0: "batch", 1: "tokens"}
+    torch.onnx.export(
+        LastHiddenState(),
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "token_type_ids": dynamic,
+                      "last_hidden_state": dynamic},
+        opset_version=14,
+    )
+    written = [path]
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_path = os.path.join(directory, QUANTIZED_MODEL_FILE)
+        quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+        written.append(quantized_path)
+    return written
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["export"]:
+        sys.exit("usage: python onnx_embedder.py export [directory] [--no-quantize]")
+    target = next((arg for arg in sys.argv[2:] if not arg.startswith("--")), ONNX_MODEL_DIR)
+    for file in export_onnx("all-MiniLM-L6-v2", target, quantize="--no-quantize" not in sys.argv):
+        print(f"Wrote {file}")
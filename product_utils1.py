@@ -1,7 +1,8 @@
-import requests
 import re
 from typing import Dict, Optional, Tuple
 
+from tools.portal_client import portal_client
+
 API_URL = "https://portal.lotuselectronics.com/web-api/home/product_detail"
 HEADERS = {
     "accept": "application/json, text/plain, */*",
@@ -13,7 +14,6 @@ HEADERS = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.0.0.0"
 }
 PRODUCT_ID_PATTERN = re.compile(r"/(\d+)/?$")
-REQUEST_TIMEOUT = 10  # seconds
 
 def extract_product_id_from_url(url: str) -> Optional[str]:
     match = PRODUCT_ID_PATTERN.search(url)
@@ -26,11 +26,10 @@ def get_product_details(product_id: str) -> Optional[Dict]:
         "product_name": f"product-{product_id}"
     }
     try:
-        response = requests.post(
+        response = portal_client.post_sync(
             API_URL,
             headers=HEADERS,
-            data=data,
-            timeout=REQUEST_TIMEOUT
+            data=data
         )
         response.raise_for_status()
         result = response.json()
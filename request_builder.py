@@ -0,0 +1,69 @@
+# request_builder.py
+
+import copy
+import json
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from history_manager import count_text_tokens, summary_message
+
+
+class RequestBuilder:
+    """
+    Builds chat requests with a byte-stable prefix.
+
+    Providers cache prompt prefixes (OpenAI from 1024 tokens, in 128-token
+    steps), so every request should start with the same bytes: the system
+    prompt and the tool schemas are serialized once here and reused as-is.
+    Per-session text follows in order of how rarely it changes: the summary
+    of dropped turns and past turns (append-only between compactions), then
+    the volatile context note (phone, login state), then the new user message.
+    """
+
+    def __init__(self, system_prompt: str, registry: Dict[str, Tuple[Any, Dict[str, Any]]]):
+        self.system_message = {"role": "system", "content": system_prompt}
+        # Deep copies so later edits to a registry schema cannot shift the prefix
+        self.tools = [{"type": "function", "function": copy.deepcopy(schema)} for _, schema in registry.values()]
+        prefix = json.dumps([self.system_message, self.tools], separators=(",", ":"), ensure_ascii=False)
+        self.prefix_fingerprint = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+        self.prefix_tokens = count_text_tokens(system_prompt) + count_text_tokens(json.dumps(self.tools))
+        self.usage_stats = {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "cache_hits": 0,
+        }
+
+    def build_messages(self, history: List[Dict[str, Any]], message: str,
+                       summary: Optional[str] = None, context: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Messages for one turn; the new user message is always last"""
+        messages = [self.system_message]
+        messages.extend(summary_message(summary))
+        messages.extend(history)
+        if context:
+            messages.append({"role": "system", "content": context})
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def record_usage(self, usage: Any):
+        """Record the provider-reported usage of one completion"""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+        self.usage_stats["requests"] += 1
+        self.usage_stats["prompt_tokens"] += getattr(usage, "prompt_tokens", None) or 0
+        self.usage_stats["cached_tokens"] += cached
+        self.usage_stats["cache_hits"] += int(cached > 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.usage_stats["requests"]
+        prompt_tokens = self.usage_stats["prompt_tokens"]
+        return {
+            **self.usage_stats,
+            "prefix_fingerprint": self.prefix_fingerprint,
+            "prefix_tokens": self.prefix_tokens,
+            "tools": len(self.tools),
+            "hit_rate": round(self.usage_stats["cache_hits"] / requests, 3) if requests else 0.0,
+            "cached_token_ratio": round(self.usage_stats["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0,
+        }
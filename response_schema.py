@@ -0,0 +1,136 @@
+# response_schema.py
+
+import os
+import re
+import json
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+STRUCTURED_OUTPUT_ENABLED = os.getenv("STRUCTURED_OUTPUT", "1") != "0"
+
+TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+class Order(BaseModel):
+    itemname: Optional[str] = None
+    order_id: Optional[str] = None
+    order_date: Optional[str] = None
+    product_image: Optional[str] = None
+    invoice_no: Optional[str] = None
+    invoice_url: Optional[str] = None
+    status: Optional[str] = None
+
+
+class AnswerData(BaseModel):
+    # Keep fields added outside the schema (budget_exhausted, error)
+    model_config = ConfigDict(extra="allow")
+
+    answer: str
+    next_action: Optional[str] = None
+    escalation_needed: bool = False
+    frustration_detected: bool = False
+    orders: Optional[List[Order]] = None
+
+
+class AgentResponse(BaseModel):
+    """The answer/orders envelope the system prompt asks for"""
+    status: Literal["success", "error"]
+    data: AnswerData
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+def _strict_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    # Strict mode: every property listed as required, optional ones nullable
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+_ORDER_SCHEMA = _strict_object({field: _nullable({"type": "string"}) for field in Order.model_fields})
+
+# Hand-written rather than AgentResponse.model_json_schema(): strict mode
+# rejects defaults and optional properties, so the two are kept in step here
+RESPONSE_JSON_SCHEMA = _strict_object({
+    "status": {"type": "string", "enum": ["success", "error"]},
+    "data": _strict_object({
+        "answer": {"type": "string"},
+        "next_action": _nullable({"type": "string"}),
+        "escalation_needed": {"type": "boolean"},
+        "frustration_detected": {"type": "boolean"},
+        "orders": _nullable({"type": "array", "items": _ORDER_SCHEMA}),
+    }),
+})
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "agent_response", "strict": True, "schema": RESPONSE_JSON_SCHEMA},
+}
+
+parse_stats = {
+    "validated": 0,
+    "salvaged": 0,
+    "failed": 0,
+}
+
+
+def _salvage(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Linear-time recovery of a JSON object from free text: strip code fences,
+    take the span from the first "{" to the last "}", drop trailing commas.
+    """
+    text = text.strip()
+    if text.startswith("```json"): text = text[7:]
+    if text.startswith("```"):     text = text[3:]
+    if text.endswith("```"):       text = text[:-3]
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return None
+    try:
+        value = json.loads(TRAILING_COMMA_RE.sub(r"\1", text[start:end + 1]))
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def parse_agent_response(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Validate a model reply against AgentResponse. Replies that are not valid
+    schema JSON (structured output off, or a truncated stream) go through
+    _salvage; None if nothing parses. Null fields are dropped either way.
+    """
+    if not text:
+        return None
+    try:
+        response = AgentResponse.model_validate_json(text)
+        parse_stats["validated"] += 1
+        return response.model_dump(exclude_none=True)
+    except ValidationError:
+        pass
+
+    print(f"[DEBUG] Reply failed schema validation, salvaging JSON from: {text[:200]}...")
+    value = _salvage(text)
+    if value is None:
+        parse_stats["failed"] += 1
+        print("[ERROR] Could not extract valid JSON from response")
+        return None
+    parse_stats["salvaged"] += 1
+    try:
+        return AgentResponse.model_validate(value).model_dump(exclude_none=True)
+    except ValidationError:
+        return value
+
+
+def get_parse_stats() -> Dict[str, Any]:
+    total = sum(parse_stats.values())
+    return {
+        **parse_stats,
+        "structured_output": STRUCTURED_OUTPUT_ENABLED,
+        "salvage_rate": round((parse_stats["salvaged"] + parse_stats["failed"]) / total, 4) if total else 0.0,
+    }
@@ -1,32 +1,17 @@
 # setup_db.py
-import sqlite3
 import os
 
-DB_PATH = "chat_history.db"
-print(f"Creating tables in: {os.path.abspath(DB_PATH)}")
+from memory.migrations import migrate, AGENT_DB_MIGRATIONS, CHAT_DB_MIGRATIONS, TICKETS_DB_MIGRATIONS
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
+DATABASES = [
+    ("chat_history.db", AGENT_DB_MIGRATIONS),
+    ("chatbot.db", CHAT_DB_MIGRATIONS),
+    ("tickets.db", TICKETS_DB_MIGRATIONS),
+]
 
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS session (
-        session_id TEXT PRIMARY KEY,
-        phone TEXT,
-        is_logged_in INTEGER DEFAULT 0
-    )
-""")
-
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT,
-        role TEXT,
-        content TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-""")
-
-conn.commit()
-conn.close()
+for db_path, migrations in DATABASES:
+    print(f"Migrating: {os.path.abspath(db_path)}")
+    version = migrate(db_path, migrations)
+    print(f"  schema version {version}")
 
 print("✅ Tables created successfully.")
@@ -267,6 +267,7 @@ class ChatBot {
         this.chatMessages.appendChild(div);
         this.scrollToBottom();
         this.messageCount++;
+        return div.querySelector('.message-bubble p');
     }
 
     addProductCard(product) {
@@ -560,6 +561,120 @@ class ChatBot {
     }
 
     generateBotResponse(userMessage) {
+        // Fall back to the plain JSON endpoint where response streaming is unavailable
+        if (!window.ReadableStream || !window.TextDecoder) {
+            this.generateBotResponseJson(userMessage);
+            return;
+        }
+        this.showTypingIndicator();
+
+        let bubble = null;
+        let streamed = '';
+        let finished = false;
+
+        fetch(`${this.baseUrl}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-API-Key': this.apiKey,
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({ message: userMessage, session_id: this.sessionId })
+        })
+        .then(async res => {
+            if (!res.ok) {
+                const err = await res.json().catch(() => ({}));
+                throw new Error(err.detail || `Status ${res.status}`);
+            }
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let sep;
+                while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                    const { event, data } = this.parseSseFrame(buffer.slice(0, sep));
+                    buffer = buffer.slice(sep + 2);
+                    if (event === 'token') {
+                        // Show the answer as plain text while it is generated; the
+                        // formatted render happens once, from the final parsed answer
+                        if (!bubble) {
+                            this.hideTypingIndicator();
+                            bubble = this.addMessage('', 'bot');
+                        }
+                        streamed += data.text;
+                        bubble.textContent = streamed;
+                        this.scrollToBottom();
+                    } else if (event === 'reset') {
+                        streamed = '';
+                        if (bubble) {
+                            bubble.closest('.message').remove();
+                            bubble = null;
+                            this.showTypingIndicator();
+                        }
+                    } else if (event === 'tool') {
+                        this.showToolStatus(data.status === 'started' ? data.name : null);
+                    } else if (event === 'done') {
+                        finished = true;
+                        this.hideTypingIndicator();
+                        this.renderBotResponse(data, bubble);
+                    }
+                }
+            }
+            if (!finished) throw new Error('Connection closed before the reply finished');
+        })
+        .catch(err => {
+            console.error("API error:", err);
+            this.hideTypingIndicator();
+            const errorMessage = `Oops, something went wrong: ${err.message}`;
+            this.addMessage(errorMessage, 'bot');
+            this.speak(errorMessage);
+        });
+    }
+
+    parseSseFrame(frame) {
+        let event = 'message';
+        const dataLines = [];
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart());
+        });
+        let data = {};
+        try {
+            data = dataLines.length ? JSON.parse(dataLines.join('\n')) : {};
+        } catch (e) {
+            console.warn('Bad SSE payload:', frame);
+        }
+        return { event, data };
+    }
+
+    showToolStatus(toolName) {
+        const labels = {
+            check_user: 'Checking your account...',
+            send_otp: 'Sending OTP...',
+            sign_in: 'Signing you in...',
+            get_orders: 'Fetching your orders...',
+            check_product_delivery: 'Checking delivery...',
+            check_near_stores: 'Finding nearby stores...',
+            raise_ticket: 'Raising a ticket...'
+        };
+        let status = this.typingIndicator.querySelector('.typing-status');
+        if (!toolName) {
+            if (status) status.remove();
+            return;
+        }
+        if (!status) {
+            status = document.createElement('small');
+            status.className = 'typing-status';
+            this.typingIndicator.appendChild(status);
+        }
+        status.textContent = labels[toolName] || 'Working on it...';
+        this.showTypingIndicator();
+    }
+
+    generateBotResponseJson(userMessage) {
         this.showTypingIndicator();
 
         fetch(`${this.baseUrl}/chat`, {
@@ -580,36 +695,7 @@ class ChatBot {
         })
         .then(data => {
             this.hideTypingIndicator();
-            if (data.response) data = data.response;
-
-            if (data.status === "success" && data.data) {
-                const { answer, orders, products, comparison, end } = data.data;
-                if (answer) {
-                    this.addMessage(answer, 'bot');
-                    // Speak the bot's response
-                    this.speak(answer);
-                }
-                if (orders && Array.isArray(orders)) orders.forEach(o => this.addOrderCard(o));
-                if (products && Array.isArray(products)) products.forEach(p => this.addProductCard(p));
-                if (comparison && Array.isArray(comparison)) {
-                    comparison.forEach(item => {
-                        /* your existing comparison rendering logic */
-                    });
-                }
-                if (end) {
-                    this.addMessage(end, 'bot');
-                    // Speak the ending message
-                    this.speak(end);
-                }
-            } else if (data.status === "error") {
-                const errorMessage = data.data?.answer || "Sorry, an error occurred.";
-                this.addMessage(errorMessage, 'bot');
-                this.speak(errorMessage);
-            } else {
-                const fallbackMessage = data.data?.answer || "Sorry, I didn't get that.";
-                this.addMessage(fallbackMessage, 'bot');
-                this.speak(fallbackMessage);
-            }
+            this.renderBotResponse(data);
         })
         .catch(err => {
             console.error("API error:", err);
@@ -620,6 +706,37 @@ class ChatBot {
         });
     }
 
+    // Render a full response; `bubble` is the message already filled by streaming, if any
+    renderBotResponse(data, bubble = null) {
+        if (data.response) data = data.response;
+        const showAnswer = text => {
+            if (bubble) bubble.innerHTML = text;
+            else this.addMessage(text, 'bot');
+            this.speak(text);
+        };
+
+        if (data.status === "success" && data.data) {
+            const { answer, orders, products, comparison, end } = data.data;
+            if (answer) showAnswer(answer);
+            if (orders && Array.isArray(orders)) orders.forEach(o => this.addOrderCard(o));
+            if (products && Array.isArray(products)) products.forEach(p => this.addProductCard(p));
+            if (comparison && Array.isArray(comparison)) {
+                comparison.forEach(item => {
+                    /* your existing comparison rendering logic */
+                });
+            }
+            if (end) {
+                this.addMessage(end, 'bot');
+                // Speak the ending message
+                this.speak(end);
+            }
+        } else if (data.status === "error") {
+            showAnswer(data.data?.answer || "Sorry, an error occurred.");
+        } else {
+            showAnswer(data.data?.answer || "Sorry, I didn't get that.");
+        }
+    }
+
 
     showTypingIndicator() {
         this.isTyping = true;
@@ -629,6 +746,7 @@ class ChatBot {
     hideTypingIndicator() {
         this.isTyping = false;
         this.typingIndicator.classList.remove('active');
+        this.showToolStatus(null);
     }
     showWelcomeMessage() {
         const welcomeMessage = "Hello! I'm your Lotus Customer Support Assistant. How can I help you today?";
@@ -0,0 +1,28 @@
+# tests/test_onnx_parity.py
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from benchmark import PARITY_MIN_COSINE, PARITY_QUERIES
+from onnx_embedder import MODEL_FILE, ONNX_MODEL_DIR, QUANTIZED_MODEL_FILE, OnnxEmbedder
+
+
+@pytest.fixture(scope="module")
+def reference():
+    model = sentence_transformers.SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+    return model.encode(PARITY_QUERIES, normalize_embeddings=True)
+
+
+@pytest.mark.parametrize("quantized, model_file", [(False, MODEL_FILE), (True, QUANTIZED_MODEL_FILE)])
+def test_onnx_matches_sentence_transformer(reference, quantized, model_file):
+    if not os.path.exists(os.path.join(ONNX_MODEL_DIR, model_file)):
+        pytest.skip(f"{model_file} not exported (python onnx_embedder.py export)")
+    vectors = OnnxEmbedder(quantized=quantized).encode(PARITY_QUERIES)
+    cosines = (vectors * reference).sum(axis=1)
+    assert cosines.min() >= PARITY_MIN_COSINE[quantized], f"min cosine {cosines.min():.5f}"
@@ -0,0 +1,81 @@
+# tests/test_redis_store.py
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from memory.redis_store import REDIS_COMPRESS_MIN_BYTES, RedisSessionStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_store(ttl: float = 60) -> RedisSessionStore:
+    return RedisSessionStore(client=fakeredis.FakeAsyncRedis(), ttl=ttl, key_prefix="test:")
+
+
+def test_round_trip():
+    async def scenario():
+        store = make_store()
+        assert await store.get("s1") is None
+        memory = {"history": [{"role": "user", "content": "namaste", "timestamp": None}], "is_authenticated": False}
+        await store.set("s1", memory)
+        assert await store.get("s1") == memory
+        assert await store.setdefault("s1", {"history": []}) == memory
+        assert await store.pop("s1") == memory
+        assert await store.get("s1") is None
+        stats = store.get_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 2
+
+    run(scenario())
+
+
+def test_setdefault_creates_once():
+    async def scenario():
+        store = make_store()
+        default = {"history": [], "is_authenticated": False}
+        assert await store.setdefault("s1", default) == default
+        assert await store.setdefault("s1", {"history": ["other"]}) == default
+
+    run(scenario())
+
+
+def test_expiry():
+    async def scenario():
+        store = make_store(ttl=1)
+        await store.set("s1", {"history": []})
+        assert 0 < await store.client.ttl("test:s1") <= 1
+        await asyncio.sleep(1.1)
+        assert await store.get("s1") is None
+
+    run(scenario())
+
+
+def test_zero_ttl_never_expires():
+    async def scenario():
+        store = make_store(ttl=0)
+        await store.set("s1", {"history": []})
+        await store.setdefault("s2", {"history": []})
+        assert await store.get("s1") == {"history": []}
+        assert await store.client.ttl("test:s1") == -1  # no expiry
+        assert await store.client.ttl("test:s2") == -1
+
+    run(scenario())
+
+
+def test_large_sessions_are_compressed():
+    async def scenario():
+        store = make_store()
+        small = {"history": []}
+        large = {"history": [{"role": "assistant", "content": "x" * REDIS_COMPRESS_MIN_BYTES}]}
+        await store.set("small", small)
+        await store.set("large", large)
+        assert (await store.client.get("test:small")).startswith(b"j")
+        blob = await store.client.get("test:large")
+        assert blob.startswith(b"z") and len(blob) < REDIS_COMPRESS_MIN_BYTES
+        assert await store.get("large") == large
+
+    run(scenario())
@@ -1,5 +1,6 @@
 import httpx
 import logging
+from .portal_client import portal_client
 AUTH_HEADERS = {
     "auth-key": "Web2@!9",
     "end-client": "Lotus-Web"
@@ -12,9 +13,8 @@ VERIFY_OTP_URL = "https://portal.lotuselectronics.com/web-api/user/signin"
 
 async def check_user(phone: str) -> dict:
     data = {"user_name": phone, "btn": "0"}
-    async with httpx.AsyncClient() as client:
-        response = await client.post(CHECK_USER_URL, data=data, headers=AUTH_HEADERS)
-        return response.json()
+    response = await portal_client.post(CHECK_USER_URL, data=data, headers=AUTH_HEADERS)
+    return response.json()
 
 
 
@@ -49,11 +49,9 @@ async def send_otp(phone: str) -> dict:
         }
 
     try:
-        timeout = httpx.Timeout(connect=5.0, read=10.0, write=10.0, pool=5.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(SEND_OTP_URL, data=data, headers=AUTH_HEADERS_otp)
-            response.raise_for_status()
-            return response.json()
+        response = await portal_client.post(SEND_OTP_URL, data=data, headers=AUTH_HEADERS_otp)
+        response.raise_for_status()
+        return response.json()
 
     except httpx.ReadTimeout:
         logger.error("OTP request timed out for phone: %s", phone)
@@ -108,19 +106,18 @@ send_otp_schema = {
 
 async def verify_otp(phone: str, otp: str, session_id: str) -> dict:
     data = {"user_name": phone, "password": otp, "is_otp": "1"}
-    async with httpx.AsyncClient() as client:
-        response = await client.post(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS)
-        result = response.json()
-        # If successful, add session_id to result for tracking
-        if result.get("error") == "0":
-            result["session_id"] = session_id
-            auth_token = (
-                result.get("auth_token") or
-                (result.get("data", {}).get("auth_token") if isinstance(result.get("data"), dict) else None)
-            )
-            if auth_token:
-                result["auth_token"] = auth_token
-        return result
+    response = await portal_client.post(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS)
+    result = response.json()
+    # If successful, add session_id to result for tracking
+    if result.get("error") == "0":
+        result["session_id"] = session_id
+        auth_token = (
+            result.get("auth_token") or
+            (result.get("data", {}).get("auth_token") if isinstance(result.get("data"), dict) else None)
+        )
+        if auth_token:
+            result["auth_token"] = auth_token
+    return result
 
 
 
@@ -165,31 +162,30 @@ async def sign_in(phone: str, password: str, session_id: str) -> dict:
         "is_otp": "1",
         "recaptcha_token": "chatbot-bypass-token"
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS_sign)
-        result = response.json()
-        if result.get("error") == "0":
-            first_name = result.get('data', {}).get('first_name', '')
-            last_name = result.get('data', {}).get('last_name', '')
-            auth_token = (
-                result.get("auth_token") or
-                result.get('data', {}).get("auth_token")
-            )
-            answer = f"Login successful. Welcome, {first_name}!"
-            status = "success"
-        else:
-            first_name = None
-            auth_token = None
-            answer = result.get("message", "Login failed.")
-            status = "error"
-        return {
-            "status": status,
-            "data": {
-                "answer": answer,
-                "name": f"{first_name} {last_name}",
-                "auth_token": auth_token
-            }
+    response = await portal_client.post(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS_sign)
+    result = response.json()
+    if result.get("error") == "0":
+        first_name = result.get('data', {}).get('first_name', '')
+        last_name = result.get('data', {}).get('last_name', '')
+        auth_token = (
+            result.get("auth_token") or
+            result.get('data', {}).get("auth_token")
+        )
+        answer = f"Login successful. Welcome, {first_name}!"
+        status = "success"
+    else:
+        first_name = None
+        auth_token = None
+        answer = result.get("message", "Login failed.")
+        status = "error"
+    return {
+        "status": status,
+        "data": {
+            "answer": answer,
+            "name": f"{first_name} {last_name}",
+            "auth_token": auth_token
         }
+    }
 def sign_in_test(phone: str, password: str, session_id: str) -> dict:
     data = {
         "user_name": phone,
@@ -198,7 +194,7 @@ def sign_in_test(phone: str, password: str, session_id: str) -> dict:
         "recaptcha_token": "chatbot-bypass-token"
     }
 
-    response = httpx.post(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS_sign)
+    response = portal_client.post_sync(VERIFY_OTP_URL, data=data, headers=AUTH_HEADERS_sign)
     result = response.json()
 
     if result.get("error") == "0":
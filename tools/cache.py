@@ -0,0 +1,231 @@
+import time
+import inspect
+import asyncio
+import logging
+import functools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Returned by a fetcher when a conditional request says the cached value is current
+NOT_MODIFIED = object()
+
+# fetch(validators) -> (value, validators) | NOT_MODIFIED | (None, None) for "don't cache"
+Fetcher = Callable[[Dict[str, str]], Awaitable[Any]]
+
+
+class _Entry:
+    __slots__ = ("value", "validators", "fetched_at", "ttl", "stale_ttl", "retry_at")
+
+    def __init__(self, value: Any, validators: Dict[str, str], fetched_at: float,
+                 ttl: float, stale_ttl: float):
+        self.value = value
+        self.validators = validators
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.retry_at = 0.0  # after a failed revalidation, no new attempt before this
+
+
+class AsyncTTLCache:
+    """
+    Per-key TTL cache for async tool results.
+
+    - Fresh entries (younger than ttl) are returned without a request.
+    - Entries older than ttl but younger than stale_ttl are returned at once
+      while one background task revalidates them (stale-while-revalidate),
+      unless swr is off, in which case the caller waits for the refresh.
+    - Refreshes are conditional: the fetcher receives the validators
+      (ETag / Last-Modified) of the cached value and may return NOT_MODIFIED.
+    - Concurrent misses for the same key share one fetch.
+    - A fetcher result of (value, None) marks a failure. If it revalidates an
+      entry still within stale_ttl, the stale value is kept and served
+      instead (stale-if-error), and revalidation is not retried for
+      retry_backoff seconds. On a cold miss the failure is passed through and,
+      when negative_ttl > 0, cached for negative_ttl seconds (no stale period)
+      so a failing upstream is not hammered.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0,
+                 max_entries: int = 1000, swr: bool = True, negative_ttl: float = 0.0,
+                 retry_backoff: float = 10.0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.swr = swr
+        self.negative_ttl = negative_ttl
+        self.retry_backoff = retry_backoff
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        # Metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.negative_hits = 0
+        self.stale_if_error = 0
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def _store(self, key: str, value: Any, validators: Dict[str, str], ttl: float, stale_ttl: float):
+        self._entries[key] = _Entry(value, validators, time.monotonic(), ttl, stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _refresh(self, key: str, fetch: Fetcher) -> Any:
+        """
+        Fetch (conditionally if cached) and update the entry; shared by concurrent callers.
+        The fetch runs in a task owned by the cache and every caller awaits it
+        shielded, so cancelling one caller (client disconnect, turn deadline)
+        does not cancel the fetch for the others.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._fetch_done, key))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetch: Fetcher) -> Any:
+        cached = self._entries.get(key)
+        result = await fetch(dict(cached.validators) if cached and cached.validators else {})
+        if result is NOT_MODIFIED and cached is not None:
+            self.not_modified += 1
+            cached.fetched_at = time.monotonic()
+            return cached.value
+        value, validators = result
+        if validators is not None:
+            self._store(key, value, validators, self.ttl, self.stale_ttl)
+        else:
+            self.errors += 1
+            if self._keep_stale(cached):
+                return cached.value
+            if self.negative_ttl > 0:
+                self._store(key, value, None, self.negative_ttl, self.negative_ttl)
+        return value
+
+    def _keep_stale(self, cached: Optional[_Entry]) -> bool:
+        """After a failed refresh: keep a good entry still within its stale period"""
+        now = time.monotonic()
+        if cached is None or cached.validators is None or now - cached.fetched_at >= cached.stale_ttl:
+            return False
+        cached.retry_at = now + self.retry_backoff
+        self.stale_if_error += 1
+        return True
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every caller has gone
+
+    async def _revalidate(self, key: str, fetch: Fetcher):
+        try:
+            await self._refresh(key, fetch)
+        except Exception as e:
+            self.errors += 1
+            self._keep_stale(self._entries.get(key))
+            logger.warning("%s cache: background revalidation failed: %s", self.name, e)
+
+    async def get(self, key: str, fetch: Fetcher) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            age = now - entry.fetched_at
+            if age < entry.ttl:
+                if entry.validators is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < entry.stale_ttl and (self.swr or now < entry.retry_at):
+                self.stale_hits += 1
+                if key not in self._inflight and now >= entry.retry_at:
+                    self.revalidations += 1
+                    task = asyncio.create_task(self._revalidate(key, fetch))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return entry.value
+            self.expired += 1
+            self.revalidations += 1
+        else:
+            self.misses += 1
+        return await self._refresh(key, fetch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.stale_hits + self.misses + self.expired
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "stale_if_error": self.stale_if_error,
+        }
+
+
+def is_failure(result: Any) -> bool:
+    """Portal convention: {"error": "0"} is success, any other error value a failure"""
+    return isinstance(result, dict) and result.get("error") not in (None, "0", 0, False)
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """How a read-only tool's results are cached (see tools/tool_registry.py)"""
+    ttl: float                          # seconds a result is fresh
+    key_args: Tuple[str, ...] = ()      # arguments that identify a result
+    stale_ttl: float = 0.0              # serve stale (and revalidate) until this age
+    negative_ttl: float = 30.0          # seconds failures are cached
+    max_entries: int = 1000
+
+
+def _key_part(value: Any) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def cached_tool(name: str, fn: Callable[..., Awaitable[Any]], policy: ToolCachePolicy):
+    """
+    Wrap an async tool with an AsyncTTLCache following policy.
+    Returns (wrapper, cache). Exceptions from the tool become an error result
+    so they are negatively cached like any other failure.
+    """
+    cache = AsyncTTLCache(name, ttl=policy.ttl, stale_ttl=policy.stale_ttl,
+                          max_entries=policy.max_entries, negative_ttl=policy.negative_ttl)
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = "|".join(_key_part(bound.arguments.get(arg)) for arg in policy.key_args)
+
+        async def fetch(validators: Dict[str, str]):
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                logger.error("%s failed: %s", name, e)
+                return {"error": "1", "message": f"{name} failed: {e}"}, None
+            return result, (None if is_failure(result) else {})
+
+        return await cache.get(key, fetch)
+
+    return wrapper, cache
@@ -1,4 +1,4 @@
-import httpx
+from .portal_client import portal_client
 
 DELIVERY_URL = "https://portal.lotuselectronics.com/web-api/home/delivery_opt"
 DELIVERY_HEADERS = {
@@ -18,9 +18,8 @@ async def check_product_delivery(product_sku: str, pin_code: str, auth_token: st
         "itemcode": product_sku,
         "pin_code": pin_code
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(DELIVERY_URL, data=data, headers=headers)
-        return response.json()
+    response = await portal_client.post(DELIVERY_URL, data=data, headers=headers)
+    return response.json()
 
 check_product_delivery_schema = {
     "name": "check_product_delivery",
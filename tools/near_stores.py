@@ -1,4 +1,4 @@
-import httpx
+from .portal_client import portal_client
 
 STORES_URL = "https://portal.lotuselectronics.com/web-api/home/stores"
 STORES_HEADERS = {
@@ -17,9 +17,8 @@ async def check_near_stores(pin_code: str, auth_token: str = None) -> dict:
     data = {
         "pin_code": pin_code
     }
-    async with httpx.AsyncClient() as client:
-        response = await client.post(STORES_URL, data=data, headers=headers)
-        return response.json()
+    response = await portal_client.post(STORES_URL, data=data, headers=headers)
+    return response.json()
 
 check_near_stores_schema = {
     "name": "check_near_stores",
@@ -1,4 +1,4 @@
-import httpx
+from .portal_client import portal_client
 
 OFFERS_URL = "https://portal.lotuselectronics.com/web-api/cat_page_filter/offer_slider"
 OFFERS_HEADERS = {
@@ -13,9 +13,8 @@ OFFERS_HEADERS = {
 
 async def get_current_offers(page: str = "home", ctp: int = 0) -> dict:
     payload = {"page": page, "ctp": ctp}
-    async with httpx.AsyncClient() as client:
-        response = await client.post(OFFERS_URL, json=payload, headers=OFFERS_HEADERS)
-        return response.json()
+    response = await portal_client.post(OFFERS_URL, json=payload, headers=OFFERS_HEADERS)
+    return response.json()
 
 get_current_offers_schema = {
     "name": "get_current_offers",
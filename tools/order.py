@@ -1,8 +1,13 @@
+import os
+import hashlib
+import logging
 from typing import Dict, Optional
-from memory.memory_store import get_session_memory
+from .portal_client import portal_client
+from .cache import AsyncTTLCache, NOT_MODIFIED
 import json
 import re
-import requests
+
+logger = logging.getLogger(__name__)
 
 ORDER_API_URL = "https://portal.lotuselectronics.com/web-api/user/my_order_list?type=completed"
 ORDER_API_HEADERS = {
@@ -14,26 +19,59 @@ ORDER_API_HEADERS = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36"
 }
 
-def get_orders(auth_token: str, cookie: Optional[str] = None):
-    """
-    Retrieve the user's completed orders using the auth_token.
-    Optionally include a cookie header if provided.
-    """
-    if not auth_token:
-        return {"error": "User not authenticated. Please sign in first."}
+# Order lists per auth token: fresh for ORDERS_CACHE_TTL seconds, then served
+# stale (and revalidated in the background) for up to ORDERS_CACHE_STALE_TTL
+ORDERS_CACHE_TTL = float(os.getenv("ORDERS_CACHE_TTL", "60"))
+ORDERS_CACHE_STALE_TTL = float(os.getenv("ORDERS_CACHE_STALE_TTL", "600"))
+ORDERS_CACHE_SWR = os.getenv("ORDERS_CACHE_SWR", "1") == "1"
+ORDERS_CACHE_MAX_ENTRIES = int(os.getenv("ORDERS_CACHE_MAX_ENTRIES", "5000"))
+
+orders_cache = AsyncTTLCache(
+    "orders",
+    ttl=ORDERS_CACHE_TTL,
+    stale_ttl=ORDERS_CACHE_STALE_TTL,
+    max_entries=ORDERS_CACHE_MAX_ENTRIES,
+    swr=ORDERS_CACHE_SWR,
+)
+
+def _orders_cache_key(auth_token: str, cookie: Optional[str]) -> str:
+    """Cache key that does not keep the raw token in memory"""
+    return hashlib.sha256(f"{auth_token}\0{cookie or ''}".encode()).hexdigest()
+
+async def _fetch_orders(auth_token: str, cookie: Optional[str], validators: Dict[str, str]):
+    """One (conditional) order-list request, in the shape AsyncTTLCache expects"""
     headers = ORDER_API_HEADERS.copy()
     headers["auth-token"] = auth_token
-    headers["accept-encoding"] = "gzip, deflate, br, zstd"
     if cookie:
         headers["cookie"] = cookie
-    url = ORDER_API_URL
+    if validators.get("etag"):
+        headers["if-none-match"] = validators["etag"]
+    if validators.get("last-modified"):
+        headers["if-modified-since"] = validators["last-modified"]
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        print("DEBUG get_orders API response:", response.text)
-        return response.json()
+        response = await portal_client.get(ORDER_API_URL, headers=headers)
+        if response.status_code == 304:
+            return NOT_MODIFIED
+        response.raise_for_status()
+        result = response.json()
+        logger.debug("get_orders: %d bytes", len(response.content))
     except Exception as e:
-        print("ERROR in get_orders:", str(e))
-        return {"error": f"Failed to fetch orders: {str(e)}"}
+        logger.error("get_orders failed: %s", e)
+        return {"error": f"Failed to fetch orders: {str(e)}"}, None
+    if isinstance(result, dict) and result.get("error") not in (None, "0", 0):
+        return result, None  # not cached: usually an expired token
+    return result, {k: response.headers[k] for k in ("etag", "last-modified") if k in response.headers}
+
+async def get_orders(auth_token: str, cookie: Optional[str] = None):
+    """
+    Retrieve the user's completed orders using the auth_token.
+    Optionally include a cookie header if provided.
+    Results are cached per auth token (see orders_cache).
+    """
+    if not auth_token:
+        return {"error": "User not authenticated. Please sign in first."}
+    key = _orders_cache_key(auth_token, cookie)
+    return await orders_cache.get(key, lambda validators: _fetch_orders(auth_token, cookie, validators))
 
 get_orders_schema = {
     "name": "get_orders",
@@ -0,0 +1,193 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PORTAL_BASE_URL = "https://portal.lotuselectronics.com"
+PORTAL_MAX_CONNECTIONS = int(os.getenv("PORTAL_MAX_CONNECTIONS", "100"))
+PORTAL_MAX_KEEPALIVE = int(os.getenv("PORTAL_MAX_KEEPALIVE", "20"))
+PORTAL_KEEPALIVE_EXPIRY = float(os.getenv("PORTAL_KEEPALIVE_EXPIRY", "30"))
+PORTAL_HTTP2 = os.getenv("PORTAL_HTTP2", "1") == "1"
+
+try:
+    import h2  # noqa: F401  (installed by httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Per-endpoint timeouts, keyed by URL path; anything else gets the default
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+ENDPOINT_TIMEOUTS = {
+    "/web-api/user/check_user": httpx.Timeout(5.0),
+    "/web-api/user/send_otp": httpx.Timeout(10.0, connect=5.0, pool=5.0),
+    "/web-api/user/signin": httpx.Timeout(10.0, connect=5.0),
+    "/web-api/user/my_order_list": httpx.Timeout(15.0, connect=5.0),
+    "/web-api/home/search_products": httpx.Timeout(10.0),
+    "/web-api/home/product_detail": httpx.Timeout(10.0),
+    "/web-api/home/delivery_opt": httpx.Timeout(10.0, connect=5.0),
+    "/web-api/home/stores": httpx.Timeout(10.0, connect=5.0),
+    "/web-api/cat_page_filter/offer_slider": httpx.Timeout(10.0, connect=5.0),
+}
+
+
+class PortalClient:
+    """
+    Shared keep-alive (HTTP/2 when available) client for portal.lotuselectronics.com.
+
+    Every tool sends its requests through the one instance below instead of
+    opening a client, and so a TCP+TLS connection, per call. The async
+    client serves the event loop; the sync client serves code that runs in
+    worker threads (stock checks in vector_search).
+
+    Connection reuse is measured with httpcore's trace hook: a request that
+    does not open a TCP connection went out on a pooled one.
+    """
+
+    def __init__(self):
+        self.http2 = PORTAL_HTTP2 and HTTP2_AVAILABLE
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Metrics
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.http_versions: Dict[str, int] = {}
+        self.endpoints: Dict[str, Dict[str, float]] = {}
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "timeout": DEFAULT_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=PORTAL_MAX_CONNECTIONS,
+                max_keepalive_connections=PORTAL_MAX_KEEPALIVE,
+                keepalive_expiry=PORTAL_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_kwargs())
+        return self._async_client
+
+    def _get_sync_client(self) -> httpx.Client:
+        with self._sync_lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**self._client_kwargs())
+            return self._sync_client
+
+    def _on_trace(self, event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            with self._stats_lock:
+                self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._stats_lock:
+                self.tls_handshakes += 1
+
+    async def _async_trace(self, event_name: str, info: Dict[str, Any]):
+        self._on_trace(event_name)
+
+    def _sync_trace(self, event_name: str, info: Dict[str, Any]):
+        self._on_trace(event_name)
+
+    def _prepare(self, url: str, kwargs: Dict[str, Any]) -> str:
+        path = urlsplit(url).path
+        kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(path, DEFAULT_TIMEOUT))
+        return path
+
+    def _record(self, path: str, started: float, response: Optional[httpx.Response]):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self.requests += 1
+            endpoint = self.endpoints.setdefault(path, {"requests": 0, "errors": 0, "total_ms": 0.0})
+            endpoint["requests"] += 1
+            endpoint["total_ms"] += elapsed_ms
+            if response is None:
+                self.errors += 1
+                endpoint["errors"] += 1
+            else:
+                self.http_versions[response.http_version] = self.http_versions.get(response.http_version, 0) + 1
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        path = self._prepare(url, kwargs)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self._get_async_client().request(
+                method, url, extensions={"trace": self._async_trace}, **kwargs
+            )
+            return response
+        finally:
+            self._record(path, started, response)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def request_sync(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Blocking variant for code running in worker threads"""
+        path = self._prepare(url, kwargs)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self._get_sync_client().request(
+                method, url, extensions={"trace": self._sync_trace}, **kwargs
+            )
+            return response
+        finally:
+            self._record(path, started, response)
+
+    def post_sync(self, url: str, **kwargs) -> httpx.Response:
+        return self.request_sync("POST", url, **kwargs)
+
+    async def start(self):
+        """Open the async client (application startup)"""
+        self._get_async_client()
+        if PORTAL_HTTP2 and not HTTP2_AVAILABLE:
+            logger.warning("PORTAL_HTTP2 is set but the h2 package is missing; using HTTP/1.1 keep-alive")
+
+    async def close(self):
+        """Close both clients and their pooled connections (application shutdown)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        with self._sync_lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "http2": self.http2,
+                "requests": self.requests,
+                "errors": self.errors,
+                "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "reuse_rate": round(reused / self.requests, 4) if self.requests else 0.0,
+                "http_versions": dict(self.http_versions),
+                "endpoints": {
+                    path: {
+                        "requests": int(e["requests"]),
+                        "errors": int(e["errors"]),
+                        "avg_ms": round(e["total_ms"] / e["requests"], 1) if e["requests"] else 0.0,
+                    }
+                    for path, e in self.endpoints.items()
+                },
+            }
+
+
+# Global portal client instance
+portal_client = PortalClient()
@@ -1,7 +1,8 @@
-import sqlite3
 from datetime import datetime
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from memory.sqlite_pool import get_connection
+from memory.migrations import migrate, TICKETS_DB_MIGRATIONS
 
 DB_FILE = 'tickets.db'
 
@@ -11,39 +12,23 @@ def get_india_time():
 
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            phone TEXT,
-            name TEXT,
-            problem TEXT,
-            order_id TEXT,
-            invoice_no TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    """Bring the tickets schema up to date (run once at startup)"""
+    migrate(DB_FILE, TICKETS_DB_MIGRATIONS)
 
 def save_ticket_sqlite(ticket: dict):
-    init_db()
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO tickets (timestamp, phone, name, problem, order_id, invoice_no)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
-        ticket['timestamp'],
-        ticket['phone'],
-        ticket['name'],
-        ticket['problem'],
-        ticket.get('order_id'),
-        ticket.get('invoice_no')
-    ))
-    conn.commit()
-    conn.close()
+    conn = get_connection(DB_FILE)
+    with conn:
+        conn.execute('''
+            INSERT INTO tickets (timestamp, phone, name, problem, order_id, invoice_no)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            ticket['timestamp'],
+            ticket['phone'],
+            ticket['name'],
+            ticket['problem'],
+            ticket.get('order_id'),
+            ticket.get('invoice_no')
+        ))
 
 async def raise_ticket(phone: str, name: str, problem: str, order_id: str = None, invoice_no: str = None) -> dict:
     ticket = {
@@ -4,9 +4,10 @@ import json
 import logging
 import asyncio
 from typing import Dict, List, Tuple
-import httpx
 from dotenv import load_dotenv
 
+from .portal_client import portal_client
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +25,6 @@ LOTUS_API_HEADERS = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36 Edg/137.0.0.0"
 }
 
-async_client = httpx.AsyncClient(timeout=10.0)
 PRODUCT_PROCESS_LIMIT = 4
 
 def extract_product_category_for_api(query: str) -> str:
@@ -89,7 +89,7 @@ async def get_product_details(product_id: str) -> Tuple[bool, Dict]:
             "cat_name": f"/product/{product_id}",
             "product_name": f"product-{product_id}"
         }
-        response = await async_client.post(url, headers=LOTUS_API_HEADERS, data=data)
+        response = await portal_client.post(url, headers=LOTUS_API_HEADERS, data=data)
         response.raise_for_status()
         result = response.json()
         if "data" in result and "product_detail" in result["data"]:
@@ -115,7 +115,7 @@ async def search_lotus_products(query: str, limit: int = 10) -> List[Dict]:
             "offset": "0",
             "orderby": ""
         }
-        response = await async_client.post(url, headers=LOTUS_API_HEADERS, data=data)
+        response = await portal_client.post(url, headers=LOTUS_API_HEADERS, data=data)
         response.raise_for_status()
         result = response.json()
         
@@ -1,10 +1,34 @@
 from .search import search_products, search_products_schema
 from .auth import check_user, check_user_schema, send_otp, send_otp_schema, verify_otp, verify_otp_schema, sign_in, sign_in_schema
-from .order import get_orders, get_orders_schema
+from .order import get_orders, get_orders_schema, orders_cache
 from .offers import get_current_offers, get_current_offers_schema
 from .check_delivery import check_product_delivery, check_product_delivery_schema
 from .near_stores import check_near_stores, check_near_stores_schema
 from .raise_ticket import raise_ticket, raise_ticket_schema
+from .cache import ToolCachePolicy, cached_tool
+import os
+
+# Read-only tools whose results change on the order of hours. Keys are built
+# from key_args only (auth_token does not change the answer). get_orders has
+# its own per-token cache in tools/order.py. Policies apply to registered
+# tools only (get_current_offers is not exposed to the agent yet).
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "1") == "1"
+TOOL_CACHE_POLICIES = {
+    "get_current_offers": ToolCachePolicy(ttl=3600, stale_ttl=4 * 3600, key_args=("page", "ctp")),
+    "check_near_stores": ToolCachePolicy(ttl=6 * 3600, stale_ttl=24 * 3600, key_args=("pin_code",)),
+    "check_product_delivery": ToolCachePolicy(ttl=1800, stale_ttl=2 * 3600, key_args=("product_sku", "pin_code"),
+                                              max_entries=10000),
+}
+
+# Concurrent calls per tool across all sessions in this process; parallel tool
+# calls in one turn each take a slot. Login/OTP endpoints are kept tighter.
+DEFAULT_TOOL_CONCURRENCY = int(os.getenv("DEFAULT_TOOL_CONCURRENCY", "32"))
+TOOL_CONCURRENCY_LIMITS = {
+    "check_user": 16,
+    "send_otp": 8,
+    "sign_in": 8,
+    "raise_ticket": 8,
+}
 
 
 tool_registry = {
@@ -18,6 +42,17 @@ tool_registry = {
     "raise_ticket": (raise_ticket, raise_ticket_schema),
 }
 
+tool_caches = {"get_orders": orders_cache}
+if TOOL_CACHE_ENABLED:
+    for _name, _policy in TOOL_CACHE_POLICIES.items():
+        if _name in tool_registry:
+            _fn, _schema = tool_registry[_name]
+            _cached_fn, tool_caches[_name] = cached_tool(_name, _fn, _policy)
+            tool_registry[_name] = (_cached_fn, _schema)
+
+def get_tool_cache_stats() -> dict:
+    """Hit/miss counters of every cached tool"""
+    return {name: cache.get_stats() for name, cache in tool_caches.items()}
+
 def is_authenticated(memory: dict) -> bool:
     return bool(memory.get("auth_token")) 
-
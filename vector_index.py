@@ -0,0 +1,255 @@
+# vector_index.py
+
+import os
+import sys
+import json
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "pinecone")  # "pinecone" or "local"
+PINECONE_HOST = os.getenv("PINECONE_HOST", "https://lotus-products-jsy3z1v.svc.aped-4627-b74a.pinecone.io")
+PINECONE_INDEX = os.getenv("PINECONE_INDEX", "lotus-products")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vector_index")
+# The product price is stored for display as a formatted string ("12,999");
+# range filters need a numeric copy, written by export / add-price-values
+PRICE_FIELD = os.getenv("VECTOR_PRICE_FIELD", "product_mrp")
+PRICE_VALUE_FIELD = os.getenv("VECTOR_PRICE_VALUE_FIELD", "price_value")
+
+# Files of a local index directory
+EMBEDDINGS_FILE = "embeddings.npy"   # float32 (n, dim), rows L2-normalized
+METADATA_FILE = "metadata.json"      # [{"id": ..., "metadata": {...}}, ...] in row order
+
+
+class VectorIndex(ABC):
+    """
+    Product embedding index queried by vector_search.
+
+    query() takes a Pinecone-style metadata filter, e.g.
+    {"price": {"$gte": 10000, "$lte": 20000}, "category": {"$eq": "tv"}},
+    and returns {"matches": [{"id", "score", "metadata"}, ...]} best first.
+    """
+
+    backend = ""
+
+    def __init__(self):
+        self.queries = 0
+        self.total_query_ms = 0.0
+
+    @abstractmethod
+    def _query(self, vector: Sequence[float], top_k: int,
+               filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ...
+
+    def query(self, vector: Sequence[float], top_k: int,
+              filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        matches = self._query(vector, top_k, filter or None)
+        self.queries += 1
+        self.total_query_ms += (time.perf_counter() - started) * 1000
+        return {"matches": matches}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "queries": self.queries,
+            "avg_query_ms": round(self.total_query_ms / self.queries, 2) if self.queries else 0.0,
+        }
+
+
+class PineconeVectorIndex(VectorIndex):
+    """The hosted `lotus-products` Pinecone index (one network round trip per query)"""
+
+    backend = "pinecone"
+
+    def __init__(self, index_name: str = PINECONE_INDEX, host: str = PINECONE_HOST):
+        super().__init__()
+        try:
+            from pinecone import Pinecone
+        except ImportError as e:
+            raise RuntimeError("VECTOR_INDEX_BACKEND=pinecone requires the 'pinecone' package") from e
+        self.index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name, host=host)
+
+    def _query(self, vector, top_k, filter):
+        kwargs = {"filter": filter} if filter else {}
+        response = self.index.query(vector=list(vector), top_k=top_k, include_metadata=True, **kwargs)
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+            for match in response.get("matches", [])
+        ]
+
+
+def price_value(value: Any) -> Optional[float]:
+    """Number of a display price such as "12,999" or "₹ 1,299.00" (None if there is none)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float("".join(ch for ch in str(value) if ch.isdigit() or ch == "."))
+    except ValueError:
+        return None
+
+
+def with_price_value(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """metadata plus PRICE_VALUE_FIELD parsed from PRICE_FIELD, when it has a price"""
+    value = price_value(metadata.get(PRICE_FIELD)) if PRICE_FIELD in metadata else None
+    return {**metadata, PRICE_VALUE_FIELD: value} if value is not None else metadata
+
+
+def _numeric(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+class LocalVectorIndex(VectorIndex):
+    """
+    In-process exact search over a memory-mapped embedding matrix.
+
+    Scores are cosine similarities (one matrix-vector product); metadata
+    filters become boolean masks over per-field columns, built on first use.
+    As in Pinecone, range operators only match numeric values, and entries
+    without a field never match a filter on it.
+    Build the directory with build_local_index() or `python vector_index.py export`.
+    """
+
+    backend = "local"
+
+    def __init__(self, directory: str = LOCAL_INDEX_DIR):
+        super().__init__()
+        self.directory = directory
+        self.embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            rows = json.load(f)
+        if len(rows) != len(self.embeddings):
+            raise ValueError(f"{directory}: {len(rows)} metadata rows for {len(self.embeddings)} embeddings")
+        self.ids = [row["id"] for row in rows]
+        self.metadata = [row.get("metadata") or {} for row in rows]
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, List[Any]] = {}
+
+    def _numeric_column(self, field: str) -> np.ndarray:
+        column = self._numeric.get(field)
+        if column is None:
+            column = self._numeric[field] = np.array(
+                [_numeric(m.get(field)) for m in self.metadata], dtype=np.float64
+            )
+        return column
+
+    def _value_column(self, field: str) -> List[Any]:
+        column = self._values.get(field)
+        if column is None:
+            column = self._values[field] = [m.get(field) for m in self.metadata]
+        return column
+
+    def _mask(self, filter: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, condition in filter.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    column = self._numeric_column(field)
+                    with np.errstate(invalid="ignore"):
+                        mask &= {
+                            "$gt": column > operand, "$gte": column >= operand,
+                            "$lt": column < operand, "$lte": column <= operand,
+                        }[op]
+                elif op in ("$eq", "$ne", "$in", "$nin"):
+                    values = self._value_column(field)
+                    accepted = set(operand) if op in ("$in", "$nin") else {operand}
+                    matches = np.fromiter((value in accepted for value in values), dtype=bool, count=len(values))
+                    mask &= ~matches if op in ("$ne", "$nin") else matches
+                else:
+                    raise ValueError(f"Unsupported filter operator {op!r}")
+        return mask
+
+    def _query(self, vector, top_k, filter):
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+        scores = np.asarray(self.embeddings @ query)
+        candidates = np.arange(len(scores))
+        if filter:
+            candidates = candidates[self._mask(filter)]
+        if not len(candidates):
+            return []
+        k = min(top_k, len(candidates))
+        best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {"id": self.ids[i], "score": float(scores[i]), "metadata": self.metadata[i]}
+            for i in best
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "vectors": len(self.ids), "dim": int(self.embeddings.shape[1])}
+
+
+def build_local_index(directory: str, ids: Sequence[str], vectors: Sequence[Sequence[float]],
+                      metadatas: Sequence[Dict[str, Any]]):
+    """Write a LocalVectorIndex directory (vectors are L2-normalized on the way)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, EMBEDDINGS_FILE), matrix)
+    with open(os.path.join(directory, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump([{"id": i, "metadata": m} for i, m in zip(ids, metadatas)], f, ensure_ascii=False)
+
+
+def _pinecone_vectors(index, batch_size: int):
+    """(id, vector) of every vector in a Pinecone index, fetched batch_size at a time"""
+    for page in index.list():
+        for start in range(0, len(page), batch_size):
+            yield from index.fetch(ids=page[start:start + batch_size]).vectors.items()
+
+
+def export_pinecone_index(directory: str = LOCAL_INDEX_DIR, batch_size: int = 100) -> int:
+    """Copy every vector of the Pinecone index into a local index directory (adding PRICE_VALUE_FIELD)"""
+    index = PineconeVectorIndex().index
+    ids, vectors, metadatas = [], [], []
+    for vector_id, vector in _pinecone_vectors(index, batch_size):
+        ids.append(vector_id)
+        vectors.append(vector.values)
+        metadatas.append(with_price_value(vector.metadata or {}))
+    build_local_index(directory, ids, vectors, metadatas)
+    return len(ids)
+
+
+def add_pinecone_price_values(batch_size: int = 100) -> int:
+    """Write PRICE_VALUE_FIELD into the metadata of every Pinecone vector missing it; returns the count"""
+    index = PineconeVectorIndex().index
+    updated = 0
+    for vector_id, vector in _pinecone_vectors(index, batch_size):
+        metadata = vector.metadata or {}
+        value = with_price_value(metadata).get(PRICE_VALUE_FIELD)
+        if value is not None and metadata.get(PRICE_VALUE_FIELD) != value:
+            index.update(id=vector_id, set_metadata={PRICE_VALUE_FIELD: value})
+            updated += 1
+    return updated
+
+
+def create_vector_index(backend: str = VECTOR_INDEX_BACKEND) -> VectorIndex:
+    """Vector index selected by VECTOR_INDEX_BACKEND"""
+    if backend == "pinecone":
+        return PineconeVectorIndex()
+    if backend == "local":
+        return LocalVectorIndex()
+    raise ValueError(f"Unknown VECTOR_INDEX_BACKEND: {backend!r} (expected 'pinecone' or 'local')")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["export"]:
+        target = sys.argv[2] if len(sys.argv) > 2 else LOCAL_INDEX_DIR
+        print(f"Exported {export_pinecone_index(target)} vectors to {target}")
+    elif sys.argv[1:2] == ["add-price-values"]:
+        print(f"Set {PRICE_VALUE_FIELD} on {add_pinecone_price_values()} Pinecone vectors")
+    else:
+        sys.exit("usage: python vector_index.py export [directory] | add-price-values")
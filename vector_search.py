@@ -1,9 +1,10 @@
 import os
 import re
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 from product_utils1 import get_product_stock_status
+from vector_index import create_vector_index, VECTOR_INDEX_BACKEND, PRICE_FIELD, PRICE_VALUE_FIELD
+from embedding_service import EmbeddingService
+from embedding_cache import create_embedding_cache, normalize_key, EMBED_DISK_CACHE_WARM
 from functools import lru_cache
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
@@ -19,28 +20,55 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Constants
-PINECONE_HOST = "https://lotus-products-jsy3z1v.svc.aped-4627-b74a.pinecone.io"
-PINECONE_INDEX = "lotus-products"
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
 MAX_WORKERS = 20
 CACHE_SIZE = 2000
 MAX_QUERY_LENGTH = 256
 STOCK_CHECK_TIMEOUT = 6
 MAX_RESULTS = 3
 
+# Metadata filtering in the index query. Price ranges are sent only once the
+# index has the numeric PRICE_VALUE_FIELD: local exports always do, Pinecone
+# after `python vector_index.py add-price-values` (then set VECTOR_PRICE_PUSHDOWN=1)
+FILTER_PUSHDOWN = os.getenv("VECTOR_FILTER_PUSHDOWN", "1") != "0"
+PRICE_PUSHDOWN = os.getenv("VECTOR_PRICE_PUSHDOWN", "1" if VECTOR_INDEX_BACKEND == "local" else "0") != "0"
+CATEGORY_FIELD = os.getenv("VECTOR_CATEGORY_FIELD", "")  # unset: no category filter
+MAX_OVERFETCH = 4  # widen the index query up to top_k * MAX_OVERFETCH
+
+search_stats = {
+    "queries": 0,
+    "index_queries": 0,
+    "widenings": 0,
+    "prefilter_dropped": 0,
+    "stock_checks": 0,
+    "wasted_stock_checks": 0,
+}
+
 # Initialize clients and models with lazy loading
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(PINECONE_INDEX, host=PINECONE_HOST)
+# Pinecone or the local in-process index, per VECTOR_INDEX_BACKEND
+index = create_vector_index()
 embedding_model = None  # Lazy load
 stock_check_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
+def load_embedding_model(backend: str = EMBEDDING_BACKEND):
+    """SentenceTransformer (torch) or the exported ONNX copy of the same model"""
+    if backend == "onnx":
+        # onnxruntime + tokenizers only: no torch import, fast cold start
+        from onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder()
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(EMBEDDING_MODEL_NAME)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend!r} (expected 'torch' or 'onnx')")
+
 def get_embedding_model():
     """Lazy load the embedding model"""
     global embedding_model
     if embedding_model is None:
-        logger.info("Loading SentenceTransformer model...")
-        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        logger.info("SentenceTransformer model loaded successfully")
+        logger.info(f"Loading {EMBEDDING_MODEL_NAME} ({EMBEDDING_BACKEND} backend)...")
+        embedding_model = load_embedding_model()
+        logger.info("Embedding model loaded successfully")
     return embedding_model
 
 # Regex patterns
@@ -59,11 +87,25 @@ PRICE_RANGE_RE = re.compile(
     re.IGNORECASE | re.VERBOSE,
 )
 
+# Embeddings persisted across restarts and shared by workers (None if disabled)
+embedding_store = create_embedding_cache()
+
 @lru_cache(maxsize=CACHE_SIZE)
 def get_cached_embedding(query: str) -> List[float]:
-    """Get cached embedding for query"""
+    """Get cached embedding for query (blocking; async code uses embedding_service)"""
+    if embedding_store is not None:
+        vector = embedding_store.get(query)
+        if vector is not None:
+            return vector
     model = get_embedding_model()
-    return model.encode([query])[0].tolist()
+    vector = model.encode([query])[0].tolist()
+    if embedding_store is not None:
+        embedding_store.put(query, vector)
+    return vector
+
+# Concurrent async queries are encoded together, one forward pass per batch
+embedding_service = EmbeddingService(lambda texts: get_embedding_model().encode(texts), cache_size=CACHE_SIZE,
+                                     store=embedding_store)
 
 def _k_to_int(text: str) -> int:
     """Convert text with 'k' suffix to integer. If text is empty or invalid, return 0."""
@@ -107,6 +149,27 @@ def extract_price_filter(query: str) -> Optional[dict]:
 
     return None
 
+# Query words -> category value stored in the index
+CATEGORY_KEYWORDS = {
+    "tv": "tv", "tvs": "tv", "television": "tv",
+    "mobile": "mobile", "mobiles": "mobile", "smartphone": "mobile", "smartphones": "mobile", "phone": "mobile",
+    "laptop": "laptop", "laptops": "laptop",
+    "headphones": "headphones", "earphones": "headphones", "earbuds": "headphones",
+    "camera": "camera", "cameras": "camera",
+    "refrigerator": "refrigerator", "fridge": "refrigerator",
+    "ac": "air conditioner", "air conditioner": "air conditioner",
+    "washing machine": "washing machine",
+}
+CATEGORY_RE = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, CATEGORY_KEYWORDS), key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+def extract_category(query: str) -> Optional[str]:
+    """Category named in the query, if any"""
+    match = CATEGORY_RE.search(query)
+    return CATEGORY_KEYWORDS[match.group(1).lower()] if match else None
+
 def parse_price(price_str: str) -> Optional[float]:
     """Parse price string to float"""
     try:
@@ -208,29 +271,74 @@ async def process_product_match(match: Dict[str, Any]) -> Optional[Dict[str, Any
         logger.error(f"Match data: {match}")
         return None
 
+def _price_in_range(price: float, price_filter: Dict[str, float]) -> bool:
+    if "$lte" in price_filter and price > price_filter["$lte"]:
+        return False
+    if "$gte" in price_filter and price < price_filter["$gte"]:
+        return False
+    return True
+
+def build_metadata_filter(query: str) -> Optional[Dict[str, Any]]:
+    """Index metadata filter for the price range and category named in the query"""
+    metadata_filter = {}
+    price_filter = extract_price_filter(query)
+    if price_filter and PRICE_PUSHDOWN:
+        metadata_filter[PRICE_VALUE_FIELD] = price_filter
+    category = extract_category(query)
+    if category and CATEGORY_FIELD:
+        metadata_filter[CATEGORY_FIELD] = {"$eq": category}
+    return metadata_filter or None
+
+def _matches_filter(match: Dict[str, Any], price_filter: Optional[Dict[str, float]]) -> bool:
+    """
+    Price check on the display price (PRICE_FIELD, a string such as "12,999"),
+    before any stock check. Pinecone range filters only match numbers, so
+    without price pushdown this is the price filter; with it, a safety net.
+    Matches with an unparseable price are kept, as before.
+    """
+    if not price_filter:
+        return True
+    price = parse_price(match.get("metadata", {}).get(PRICE_FIELD, ""))
+    return price is None or _price_in_range(price, price_filter)
+
 async def search_vector_db_async(query: str, top_k: int = 5) -> Dict[str, Any]:
     """Search vector database asynchronously"""
     try:
         # Get embedding vector
-        vec = get_cached_embedding(query[:MAX_QUERY_LENGTH])
+        # Normalized (the model is uncased) so warmed-up disk cache entries match
+        vec = await embedding_service.embed(normalize_key(query[:MAX_QUERY_LENGTH]))
         
-        # Extract price filter
+        # Price/category constraints go to the index, so every match already fits
         price_filter = extract_price_filter(query)
+        metadata_filter = build_metadata_filter(query) if FILTER_PUSHDOWN else None
+        search_stats["queries"] += 1
         
-        # Query Pinecone without price filtering first
-        # We'll apply price filtering in application code
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: index.query(
-                vector=vec,
-                top_k=top_k * 2,  # Get more results to filter from
-                include_metadata=True
-            ),
-        )
+        # Over-fetch adaptively: widen only while too few matches pass the
+        # metadata check and the index may still have more
+        fetch_k = top_k
+        while True:
+            response = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: index.query(vec, fetch_k, metadata_filter),
+            )
+            search_stats["index_queries"] += 1
+            matches = response.get("matches", [])
+            candidates = [match for match in matches if _matches_filter(match, price_filter)]
+            search_stats["prefilter_dropped"] += len(matches) - len(candidates)
+            if len(candidates) >= top_k or len(matches) < fetch_k or fetch_k >= top_k * MAX_OVERFETCH:
+                break
+            fetch_k = min(fetch_k * 2, top_k * MAX_OVERFETCH)
+            search_stats["widenings"] += 1
+        if metadata_filter:
+            logger.info(f"Applied metadata filter {metadata_filter}: {len(candidates)} candidates")
         
-        # Process all matches (check stock for all, regardless of filters)
-        tasks = [process_product_match(match) for match in response.get("matches", [])]
+        # Stock checks only for the candidates we can return
+        candidates = candidates[:top_k]
+        tasks = [process_product_match(match) for match in candidates]
         results = await asyncio.gather(*tasks, return_exceptions=True)
+        search_stats["stock_checks"] += sum(
+            1 for match in candidates if match.get("metadata", {}).get("product_link")
+        )
         
         # Filter out exceptions and None results
         valid_results = []
@@ -241,34 +349,16 @@ async def search_vector_db_async(query: str, top_k: int = 5) -> Dict[str, Any]:
             if result is not None:
                 valid_results.append(result)
 
-        # Apply price filtering in application code (after stock check)
-        filtered_results = []
-        if price_filter:
-            logger.info(f"Applying price filter: {price_filter}")
-            for result in valid_results:
-                price = parse_price(result.get('price', ''))
-                if price is not None:
-                    # Check if price is within range
-                    in_range = True
-                    if "$lte" in price_filter and price > price_filter["$lte"]:
-                        in_range = False
-                    if "$gte" in price_filter and price < price_filter["$gte"]:
-                        in_range = False
-                    if in_range:
-                        filtered_results.append(result)
-                else:
-                    # If we can't parse the price, include it anyway
-                    filtered_results.append(result)
-            logger.info(f"After price filtering: {len(filtered_results)} results")
-        else:
-            filtered_results = valid_results
-
         # Sort results: in-stock first, then by relevance score
         sorted_results = sorted(
-            filtered_results,
+            valid_results,
             key=lambda x: (not x["in_stock"], -x["score"]),
             reverse=False
         )
+        # Checked but not shown: the price of preferring in-stock products
+        search_stats["wasted_stock_checks"] += sum(
+            1 for result in sorted_results[MAX_RESULTS:] if result["link"]
+        )
 
         # Always return up to MAX_RESULTS, in-stock first, but include out-of-stock if not enough in-stock
         if not sorted_results:
@@ -286,6 +376,18 @@ async def search_vector_db_async(query: str, top_k: int = 5) -> Dict[str, Any]:
         logger.error(f"Vector search error: {e}")
         return {"type": "general_search", "results": []}
 
+def get_search_stats() -> Dict[str, Any]:
+    """Index queries and stock-check counters of product search"""
+    checks = search_stats["stock_checks"]
+    return {
+        **search_stats,
+        "filter_pushdown": FILTER_PUSHDOWN,
+        "price_pushdown": FILTER_PUSHDOWN and PRICE_PUSHDOWN,
+        "wasted_stock_check_rate": round(search_stats["wasted_stock_checks"] / checks, 4) if checks else 0.0,
+        "index": index.get_stats(),
+        "embeddings": embedding_service.get_stats(),
+    }
+
 def search_vector_db(query: str, top_k: int = 5) -> Dict[str, Any]:
     """Synchronous wrapper for vector search"""
     try:
@@ -309,9 +411,18 @@ def _run_async_search(query: str, top_k: int) -> Dict[str, Any]:
 # Pre-load the model on startup to avoid delays during first query
 def preload_model():
     """Pre-load the embedding model"""
-    logger.info("Pre-loading SentenceTransformer model...")
+    logger.info("Pre-loading embedding model...")
     get_embedding_model()
     logger.info("Model pre-loading completed")
+    warm_embedding_cache()
+
+def warm_embedding_cache(limit: int = EMBED_DISK_CACHE_WARM) -> int:
+    """Load the most frequent cached queries from disk into memory"""
+    if embedding_store is None:
+        return 0
+    warmed = embedding_service.warm(embedding_store.most_frequent(limit))
+    logger.info(f"Warmed {warmed} query embeddings from the disk cache")
+    return warmed
 
 if __name__ == "__main__":
     # Pre-load model when running directly